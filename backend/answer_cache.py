@@ -0,0 +1,133 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from identifiers import extract_identifiers
+from typing import Any, Dict, FrozenSet, List, Optional
+import numpy as np
+import threading
+import time
+
+
+@dataclass
+class _Entry:
+    question: str
+    embedding: Optional[np.ndarray]
+    answer: Dict[str, Any]
+    identifiers: FrozenSet[str] = frozenset()
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class AnswerCache:
+    # Answers keyed by normalized question, with a near-duplicate fallback by
+    # cosine similarity of query embeddings. The fallback only matches
+    # questions naming the same bills: "SB No. 2654" and "SB No. 2655" embed
+    # almost identically. Bounded by LRU size and TTL, and emptied whenever
+    # the corpus version changes.
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: Optional[float] = 24 * 3600,
+        similarity_threshold: float = 0.95,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        return " ".join(question.lower().split())
+
+    def _sync_version(self, version: Optional[str]) -> None:
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return self.ttl_seconds is not None and now - entry.created_at > self.ttl_seconds
+
+    def get_exact(self, question: str, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        key = self.normalize(question)
+        now = time.monotonic()
+        with self._lock:
+            self._sync_version(version)
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry, now):
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry.answer
+
+    def get_similar(
+        self,
+        question: str,
+        embedding: List[float],
+        version: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        identifiers = frozenset(extract_identifiers(question))
+        now = time.monotonic()
+        with self._lock:
+            self._sync_version(version)
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if entry.embedding is not None
+                and entry.identifiers == identifiers
+                and not self._expired(entry, now)
+            ]
+            if candidates:
+                matrix = np.stack([entry.embedding for _, entry in candidates])
+                scores = matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity_threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self.similar_hits += 1
+                    return entry.answer
+            self.misses += 1
+            return None
+
+    def record_miss(self) -> None:
+        # For lookups that end without trying the similarity fallback
+        with self._lock:
+            self.misses += 1
+
+    def put(
+        self,
+        question: str,
+        answer: Dict[str, Any],
+        embedding: Optional[List[float]] = None,
+        version: Optional[str] = None,
+    ) -> None:
+        vector = None
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            vector /= np.linalg.norm(vector) or 1.0
+        key = self.normalize(question)
+        with self._lock:
+            self._sync_version(version)
+            self._entries[key] = _Entry(
+                key, vector, answer, frozenset(extract_identifiers(question)))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "version": self._version,
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
@@ -1,16 +1,63 @@
-import tempfile
-from llama_parse import LlamaParse
-from fastapi import FastAPI, HTTPException, File, UploadFile
+import asyncio
+import json
+from blocking import run_blocking
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, File, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from rag import LlamaIndexRAG
-from typing import Optional, List, Dict
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from bill_timeline import TIMELINE_PROMPT, BillTimelineStore, format_timelines
+from datetime import date
+from documents import DocumentStore
+from ingestion import UploadTooLargeError, make_ingestion_runner, parse_pdf, save_upload, spool_upload
+from jobs import QUEUED, JobContext, JobManager, ProgressBroadcast, ProgressCallback
+from journal_store import local_index_dir
+from identifiers import extract_identifiers
+from systems import SystemRegistry, SystemUnavailableError
+from telemetry import metrics, request_timings, server_timing_header
+from typing import Any, NamedTuple, Optional, List, Dict
 from pydantic import BaseModel
 import os
+import shutil
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await ingestion_jobs.start()
+    # Warm up in the background: the server starts answering (and reporting
+    # not-ready) immediately instead of after every backend has connected
+    warmup = asyncio.create_task(rag_systems.warm_all()) if RAG_WARMUP else None
+    try:
+        yield
+    finally:
+        if warmup is not None:
+            warmup.cancel()
+        await ingestion_jobs.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+TIMING_HEADERS = os.getenv("TIMING_HEADERS", "false").lower() in ("1", "true", "yes")
+
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    started = time.perf_counter()
+    with request_timings() as timings:
+        response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    # Route templates, not raw paths, so document and job IDs do not become labels;
+    # for streamed responses this is the time until headers were sent
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    metrics.observe("request_seconds", elapsed, route=route, method=request.method)
+    if TIMING_HEADERS:
+        timings["total"] = elapsed
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
 
 # Add CORS middleware
 app.add_middleware(
@@ -187,156 +234,24 @@ JOURNAL_SYSTEM_PROMPT = """
     For each section, include a brief summary of the contents of the transcript. Be as detailed as possible. If not specified in the document, respond with the information in the example output instead.
 """
 
-JOURNAL_OUTPUT = """
-    Journal of the Senate Session - August 5, 2024
-
-    Opening of the Session
-    The session commenced at 3:07 PM, led by President Pro Tempore Hon. Jinggoy Ejercito Estrada. 
-    The session was called to order for the 6th session of the Senate in the Third Regular Session 
-    of the Nineteenth Congress.
-    
-    Prayer
-    Senator Raffy T. Tulfo led the opening prayer, expressing gratitude for the success of Filipino 
-    athletes in the Paris Olympics, particularly Carlos Yulo's gold medals. He emphasized the importance 
-    of striving for national pride and improvement.
-    
-    National Anthem
-    The University of the East Chorale performed the Philippine national anthem and a song titled 
-    "Dugong Pilipino," after which appreciation was extended to the chorale.
-    
-    Roll Call
-    The roll call confirmed the presence of 22 senators, establishing a quorum.
-    
-    Acknowledgment of Guests
-    The Majority Leader acknowledged various guests in attendance, including representatives from 
-    Nueva Vizcaya, Japanese Ambassador Endo Kazuya, and others from international diplomatic missions.
-    
-    Suspension and Resumption of Session
-    A brief suspension was called at 3:19 PM to allow senators to greet Senator Joel Villanueva on 
-    his birthday. The session resumed at 3:23 PM.
-    
-    Consideration of the Journal
-    The Majority Leader moved to defer the approval of the Journal from the previous session 
-    (July 31, 2024) as it was still being finalized. This motion was approved without objection.
-
-    Manifestations
-    Senator Grace Poe
-        Senator Grace Poe addressed the Senate regarding the noticeable decrease in text scams following 
-        the President's statements about illegal Philippine Offshore Gaming Operators (POGOs). She emphasized 
-        that the reduction in scam messages correlates with the crackdown on illegal gambling operations, 
-        suggesting that these scams were often linked to POGO activities. Poe advocated for comprehensive 
-        legislation to formally ban both legal and illegal POGOs, as well as other harmful online platforms. 
-        She underscored the need for a legislative framework to ensure that such operations are prohibited, 
-        highlighting the importance of protecting citizens from scams and illegal activities. This 
-        manifestation reflects her commitment to enhancing consumer protection and addressing the issues 
-        related to online gambling.
-    Senator Joel Villanueva
-        Senator Joel Villanueva supported Poe's statements and further elaborated on the financial implications 
-        of POGOs in the Philippines. He pointed out that these operators have failed to pay significant taxes, 
-        estimating a loss of approximately P50 billion in potential revenue. Villanueva expressed his intent to 
-        file a bill aimed at repealing the taxation of POGOs and called for an outright cessation of their operations, 
-        regardless of their legal status. He argued that the costs associated with POGOs far outweigh any benefits they 
-        might provide, reinforcing the need for decisive action against these entities. His manifestation highlights 
-        a strong stance against POGOs and reflects a broader concern for fiscal responsibility and governance.
-    Senator Risa Hontiveros
-        Senator Risa Hontiveros echoed her colleagues' sentiments and focused on the regulatory aspect of POGOs. 
-        She called for PAGCOR (Philippine Amusement and Gaming Corporation) to revoke all licenses issued to POGOs 
-        in compliance with the President's ban announced during his State of the Nation Address. Hontiveros emphasized 
-        that this action would facilitate a complete shutdown of POGO operations and support efforts to find alternative 
-        employment for affected workers. She also mentioned recent legislative provisions allowing confiscated assets 
-        from raided POGOs to be utilized for rehabilitation efforts related to human trafficking and cybercrime victims. 
-        Her manifestation underscores her commitment to social justice and public safety while advocating for effective 
-        regulatory measures.
-    Senator Juan Miguel Zubiri
-        Senator Juan Miguel Zubiri took a moment to congratulate Filipino gymnast Carlos Yulo for his historic double gold 
-        medal win at the Paris Olympics. Zubiri expressed pride in Yulo's achievements, noting that such accomplishments 
-        elevate the Philippines' standing in international sports. He highlighted the importance of supporting various sports 
-        disciplines beyond basketball, advocating for a more inclusive approach to sports development in the country. 
-        Zubiri's remarks not only celebrate Yulo's success but also call attention to the potential for nurturing talent in other 
-        athletic fields, thereby fostering national pride through diverse sporting achievements.
-    Senator Aquilino "Koko" Pimentel
-        Senator Koko Pimentel shared that the Senate has officially adopted a new hymn, "Bagong Pilipinas," which will be recited during flag ceremonies. He emphasized that this initiative aims to 
-        promote national pride and unity among senators and citizens alike. By incorporating this new hymn into official proceedings, Pimentel highlighted a cultural shift towards enhancing national 
-        identity through music. His manifestation reflects a broader commitment within the Senate to foster patriotism and strengthen connections among Filipinos through shared cultural expressions.
-
-    Motions Introduced
-    Motion to Defer Journal Approval
-        The Majority Leader moved to defer the approval of the Journal from the previous session held on July 31, 2024, citing that it was still being finalized. This motion was presented to ensure 
-        that all details and discussions from the previous session were accurately captured and documented before formal approval. The motion was met with no objections from the senators present, 
-        indicating a consensus on the need for thoroughness in record-keeping. This procedural step reflects the Senate's commitment to maintaining accurate records of their proceedings, which is 
-        essential for transparency and accountability in governance.
-    
-    Motion for Suspension of Session
-        The Majority Leader requested a one-minute suspension of the session to allow senators to personally greet Senator Joel Villanueva on his birthday. This motion was granted without objection, 
-        showcasing a collegial atmosphere among the senators. The brief suspension not only allowed for personal interactions but also reinforced the camaraderie and mutual respect within the Senate. 
-        Such moments of recognition and celebration among colleagues contribute to a positive working environment, fostering relationships that can enhance collaboration on legislative matters.
-
-    Sponsorship and Co-Sponsorship Speeches
-    Senator Grace Poe
-        Senator Grace Poe highlighted the significant decrease in text scams that have been reported since the President's statements regarding illegal Philippine Offshore Gaming Operators (POGOs). 
-        She pointed out that this reduction suggests a direct correlation between the operations of illegal POGOs and the prevalence of these scams. Poe emphasized the necessity for comprehensive 
-        legislation to formally ban all POGO operations, both legal and illegal, to protect citizens from harmful online platforms. Her advocacy for such a law reflects a proactive approach to 
-        safeguarding the public from exploitation and fraud, underscoring the need for legislative measures that address emerging threats in the digital landscape.
-    
-    Senator Joel Villanueva
-        Senator Joel Villanueva expressed his support for Senator Poe's statements and elaborated on his proposed bill aimed at repealing taxes on POGOs while advocating for an end to their operations 
-        altogether. He highlighted that POGOs have not contributed significantly to government revenue, estimating a loss of at least P50 billion in potential tax revenue over the years. Villanueva 
-        stressed that the overall costs associated with POGOs outweigh any benefits they may provide, reinforcing his call for decisive action against these entities. His speech reflects a commitment
-        to fiscal responsibility and a desire to ensure that government resources are utilized effectively for the benefit of the Filipino people.
-    
-    Senator Risa Hontiveros
-        Senator Risa Hontiveros echoed the sentiments of her colleagues, reinforcing the call to ban POGOs and urging PAGCOR (Philippine Amusement and Gaming Corporation) to revoke existing licenses 
-        issued to these operators. She emphasized that revoking these licenses would align with the President’s directive to halt all POGO operations as announced during his State of the Nation Address. 
-        Hontiveros also highlighted the importance of transitioning employees affected by this ban into alternative livelihoods, advocating for support systems to help those who may lose their jobs as 
-        a result of this legislative action. Her focus on both regulatory measures and social responsibility underscores her commitment to protecting vulnerable workers while ensuring compliance with 
-        national policies.
-    
-    Senator Juan Miguel Zubiri
-        Senator Juan Miguel Zubiri took a moment to congratulate Filipino gymnast Carlos Yulo for his remarkable achievement of winning two gold medals at the Paris Olympics. Zubiri celebrated Yulo's 
-        historic accomplishment, noting that it not only brings pride to the nation but also highlights the potential for success in diverse sports beyond basketball. He advocated for formal recognition 
-        of Yulo’s achievements through resolutions and potential awards, emphasizing the need to support athletes across various disciplines. Zubiri's remarks serve as a reminder of the importance of 
-        fostering talent in multiple sports, promoting a culture of excellence and national pride in athletic accomplishments.
-    
-    Senator Aquilino "Koko" Pimentel
-        Senator Koko Pimentel announced that the Senate has officially adopted a new hymn, "Bagong Pilipinas," which will be recited during flag ceremonies. He emphasized that this initiative aims to 
-        promote national pride and unity among senators and citizens alike. By incorporating this new hymn into official proceedings, Pimentel highlighted a cultural shift towards enhancing national 
-        identity through music. His manifestation reflects a broader commitment within the Senate to foster patriotism and strengthen connections among Filipinos through shared cultural expressions.
-
-    Interpellations
-    Senator Villanueva
-        Senator Joel Villanueva interjected to express his support for Senator Grace Poe's earlier manifestation regarding the reduction of text scams linked to illegal POGOs. He reiterated his opposition 
-        to POGO operations, emphasizing their failure to contribute tax revenues to the government. Villanueva highlighted that POGOs have not paid an estimated P50 billion in taxes, which he argued 
-        demonstrates that the costs associated with these operations outweigh any potential benefits. His interpellation reinforces the need for legislative action against POGOs and reflects a commitment 
-        to ensuring fiscal responsibility within the government. By advocating for the repeal of POGO taxation and an end to their activities, Villanueva aligns himself with a growing consensus among 
-        senators who seek to protect citizens from the negative impacts of these gambling operations.
-    
-    Senator Hontiveros
-        Senator Risa Hontiveros aligned her remarks with those of her colleagues, particularly focusing on the necessity of revoking licenses issued to POGOs by PAGCOR. She emphasized that the cancellation 
-        of these licenses is crucial for enforcing the President's ban on all POGO operations, which was announced during his State of the Nation Address. Hontiveros also highlighted ongoing efforts to 
-        provide alternative employment for workers affected by the ban, showcasing her commitment to social justice and worker protection. By advocating for immediate action against POGOs and proposing 
-        support systems for displaced workers, Hontiveros underscores the importance of balancing regulatory compliance with social responsibility.
-    
-    Senator Zubiri
-        Senator Juan Miguel Zubiri took a moment during his interpellation to celebrate Carlos Yulo’s historic achievements at the Paris Olympics, where he won two gold medals. Zubiri expressed pride in 
-        Yulo's accomplishments, noting that such feats elevate national morale and highlight the potential for success in various sports beyond basketball. He emphasized the need for greater support for 
-        diverse athletic disciplines, advocating for recognition through resolutions and awards for Yulo and other athletes. Zubiri’s remarks reflect a broader commitment to promoting sports development 
-        in the Philippines, encouraging investment in various athletic programs that can foster future champions.
-    
-    Senator Pimentel
-        Senator Aquilino "Koko" Pimentel concluded the interpellations by announcing that the Senate has officially adopted the "Bagong Pilipinas" hymn for flag ceremonies. He emphasized that this 
-        initiative aims to promote national pride and unity among senators and citizens alike. By incorporating this new hymn into official proceedings, Pimentel highlights a cultural shift towards 
-        enhancing national identity through music. His interpellation serves as a reminder of the importance of fostering patriotism within legislative practices and reinforces a collective commitment 
-        among senators to celebrate Filipino culture.
-"""
-
 SYSTEM_PROMPTS = {
     "general": DEFAULT_SYSTEM_PROMPT,
     "journal": JOURNAL_SYSTEM_PROMPT
 }
 
-# Initialize systems
-rag_systems = {
-    "general": LlamaIndexRAG(
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64"))
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+JOURNAL_VECTOR_STORE = os.getenv("JOURNAL_VECTOR_STORE", "local")
+JOURNAL_LOCAL_STORE_PATH = os.getenv("JOURNAL_LOCAL_STORE_PATH", ".cache/journal_indexes")
+
+
+def build_general_system():
+    # Imported here so the llama_index/OpenAI/Astra stack loads after the
+    # server is up rather than before it can bind
+    from rag import LlamaIndexRAG
+    return LlamaIndexRAG(
         system_type="general",
         system_prompt=SYSTEM_PROMPTS["general"],
         openai_api_key=os.getenv("OPENAI_API_KEY"),
@@ -345,43 +260,430 @@ rag_systems = {
         astra_db_region=os.getenv("ASTRA_DB_REGION"),
         astra_keyspace=os.getenv("ASTRA_DB_KEYSPACE"),
         collection_name=os.getenv("ASTRA_DB_COLLECTION"),
-    ),
-    "journal": LlamaIndexRAG(
+        embedding_cache_path=EMBEDDING_CACHE_PATH,
+        embedding_cache_max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+        embedding_batch_max_size=EMBEDDING_BATCH_MAX_SIZE,
+        embedding_batch_wait_ms=EMBEDDING_BATCH_WAIT_MS,
+        vector_store_backend=os.getenv("GENERAL_VECTOR_STORE", "astra"),
+        local_store_path=os.getenv("GENERAL_LOCAL_STORE_PATH", ".cache/general_index"),
+        answer_cache_size=int(os.getenv("ANSWER_CACHE_SIZE", "1024")),
+        answer_cache_ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400")),
+        answer_cache_threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+        corpus_version=os.getenv("GENERAL_CORPUS_VERSION"),
+        corpus_manifest_path=os.getenv("GENERAL_INGEST_MANIFEST", ".cache/general_manifest.json"),
+        retrieval_mode=os.getenv("GENERAL_RETRIEVAL_MODE", "hybrid"),
+        context_token_budget=int(os.getenv("GENERAL_CONTEXT_TOKEN_BUDGET", "3000")) or None,
+        lexical_index_path=os.getenv("GENERAL_LEXICAL_INDEX_PATH", ".cache/general_lexical.jsonl"),
+    )
+
+
+def build_journal_system():
+    from rag import LlamaIndexRAG
+    return LlamaIndexRAG(
         system_type="journal",
         system_prompt=SYSTEM_PROMPTS["journal"],
         openai_api_key=os.getenv("OPENAI_API_KEY"),
-    ),
-}
+        journal_max_indexes=int(os.getenv("JOURNAL_MAX_INDEXES", "32")),
+        journal_max_nodes=int(os.getenv("JOURNAL_MAX_NODES", "200000")),
+        journal_ttl_seconds=float(os.getenv("JOURNAL_INDEX_TTL_SECONDS", "3600")),
+        journal_index_retained=documents.exists,
+        embedding_cache_path=EMBEDDING_CACHE_PATH,
+        embedding_cache_max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+        embedding_batch_max_size=EMBEDDING_BATCH_MAX_SIZE,
+        embedding_batch_wait_ms=EMBEDDING_BATCH_WAIT_MS,
+        vector_store_backend=JOURNAL_VECTOR_STORE,
+        local_store_path=JOURNAL_LOCAL_STORE_PATH,
+        retrieval_mode=os.getenv("JOURNAL_RETRIEVAL_MODE", "hybrid"),
+        context_token_budget=int(os.getenv("JOURNAL_CONTEXT_TOKEN_BUDGET", "3000")) or None,
+        journal_generation_concurrency=int(os.getenv("JOURNAL_GENERATION_CONCURRENCY", "8")),
+        journal_generation_cache_path=os.getenv(
+            "JOURNAL_GENERATION_CACHE_PATH", ".cache/journal_segments.sqlite3"),
+    )
+
+
+# Systems are built on first use, or in the background at startup when
+# RAG_WARMUP is on
+rag_systems = SystemRegistry(retry_seconds=float(os.getenv("RAG_INIT_RETRY_SECONDS", "30")))
+rag_systems.register("general", build_general_system, warmup=lambda rag: rag.awarmup())
+rag_systems.register("journal", build_journal_system, warmup=lambda rag: rag.awarmup())
+RAG_WARMUP = os.getenv("RAG_WARMUP", "true").lower() in ("1", "true", "yes")
+READINESS_SYSTEMS = [
+    name for name in os.getenv("READINESS_SYSTEMS", "general,journal").split(",") if name
+]
+
+
+def system_samples():
+    # Cache and index stats of the systems built so far, read at scrape time
+    samples = []
+    embedding_caches = {}
+    for name in rag_systems.names():
+        rag = rag_systems.peek(name)
+        samples.append(("system_ready", {"system": name}, rag is not None))
+        if rag is None:
+            continue
+        cache = getattr(rag.embed_model, "cache", None)
+        if cache is not None:
+            embedding_caches[id(cache)] = cache  # Shared between systems by path
+        if rag.answer_cache is not None:
+            stats = rag.answer_cache.stats()
+            for key in ("entries", "exact_hits", "similar_hits", "misses", "invalidations"):
+                samples.append((f"answer_cache_{key}", {"system": name}, stats[key]))
+            lookups = stats["exact_hits"] + stats["similar_hits"] + stats["misses"]
+            if lookups:
+                hits = stats["exact_hits"] + stats["similar_hits"]
+                samples.append(("answer_cache_hit_ratio", {"system": name}, hits / lookups))
+        if name == "journal":
+            for key, value in rag.journal_indexes.metrics().items():
+                if isinstance(value, dict):
+                    for reason, count in value.items():
+                        samples.append((f"journal_index_{key}", {"reason": reason}, count))
+                elif value is not None:
+                    samples.append((f"journal_index_{key}", {}, value))
+    for cache in embedding_caches.values():
+        stats = cache.stats()
+        for key, value in stats.items():
+            samples.append((f"embedding_cache_{key}", {}, value))
+        if stats["hits"] + stats["misses"]:
+            samples.append((
+                "embedding_cache_hit_ratio", {}, stats["hits"] / (stats["hits"] + stats["misses"])))
+    return samples
+
+
+metrics.add_collector(system_samples)
+
+
+async def get_system(system_type: str):
+    if system_type not in rag_systems:
+        raise HTTPException(status_code=400, detail="Invalid system type.")
+    try:
+        return await rag_systems.get(system_type)
+    except SystemUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+def drop_document_index(document_id: str) -> None:
+    # A removed transcript takes its journal index, resident and on disk, with it
+    rag = rag_systems.peek("journal")
+    if rag is not None:
+        rag.delete_index(document_id)
+    elif JOURNAL_VECTOR_STORE == "local":
+        shutil.rmtree(local_index_dir(JOURNAL_LOCAL_STORE_PATH, document_id), ignore_errors=True)
+
+
+documents = DocumentStore(
+    os.getenv("DOCUMENT_STORE_PATH", ".cache/documents"),
+    max_documents=int(os.getenv("DOCUMENT_STORE_MAX_DOCUMENTS", "500")),
+    on_remove=drop_document_index,
+)
+# Per-bill version timelines, written by ingest_corpus.py
+bill_timelines = BillTimelineStore(
+    os.getenv("BILL_TIMELINE_PATH", ".cache/bill_timelines.sqlite3"))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or None
+
+class IndexBuild(NamedTuple):
+    task: asyncio.Task
+    # Every job following the build listens here, so each gets its own progress
+    progress: ProgressBroadcast
+
+
+# Journal index builds in flight, keyed by document ID
+index_builds: Dict[str, IndexBuild] = {}
+
+
+def schedule_document_index(document_id: str, content: List[str]) -> IndexBuild:
+    build = index_builds.get(document_id)
+    if build is not None:
+        return build
+    progress = ProgressBroadcast()
+
+    async def run_build() -> str:
+        rag = await get_system("journal")
+        return await rag.aprocess_pdf_content(content, document_id, progress)
+
+    task = asyncio.create_task(run_build())
+    build = IndexBuild(task, progress)
+    index_builds[document_id] = build
+
+    def finished(t: asyncio.Task):
+        index_builds.pop(document_id, None)
+        if not t.cancelled():
+            t.exception()  # Failures surface to whoever awaits the build
+
+    task.add_done_callback(finished)
+    return build
+
+
+async def ensure_document_index(document_id: str) -> str:
+    build = index_builds.get(document_id)
+    if build is None:
+        rag = await get_system("journal")
+        # Resident or persisted on disk: no need to read the transcript
+        if await run_blocking(rag.has_index, document_id):
+            return document_id
+        # Evicted or never built: rebuild from stored content
+        if not documents.exists(document_id):
+            raise HTTPException(status_code=404, detail="Unknown document ID.")
+        content = await run_blocking(documents.content, document_id)
+        build = schedule_document_index(document_id, content)
+    # A client disconnecting must not cancel a build other requests share
+    await asyncio.shield(build.task)
+    return document_id
+
+
+async def build_document_index(content: List[str], document_id: str, progress: ProgressCallback) -> str:
+    # Joins any build already running for this document. Cancelling the job
+    # only stops it following the build, which chat requests may still need.
+    build = schedule_document_index(document_id, content)
+    build.progress.attach(progress)
+    try:
+        return await asyncio.shield(build.task)
+    finally:
+        build.progress.detach(progress)
+
+
+JOBS_UPLOAD_DIR = os.getenv("JOBS_UPLOAD_DIR", ".cache/uploads")
+os.makedirs(JOBS_UPLOAD_DIR, exist_ok=True)
+ingestion_jobs = JobManager(
+    os.getenv("JOBS_DB_PATH", ".cache/jobs.sqlite3"),
+    concurrency=int(os.getenv("INGESTION_CONCURRENCY", "2")),
+    max_finished_jobs=int(os.getenv("JOBS_MAX_FINISHED", "1000")),
+    finished_ttl_seconds=float(os.getenv("JOBS_FINISHED_TTL_SECONDS", "3600")),
+)
+ingestion_jobs.register("ingest_pdf", make_ingestion_runner(documents, build_document_index))
+
+
+async def run_journal_generation(ctx: JobContext) -> Dict[str, str]:
+    content = await run_blocking(documents.content, ctx.job.params["document_id"])
+    ctx.start_stage("generate")
+    rag = await rag_systems.get("journal")
+    journal = await rag.agenerate_journal(content, progress=ctx.progress)
+    ctx.finish_stage("generate")
+    return {"journal": journal}
+
+
+# Multi-minute map-reduce runs get their own workers, so they never hold up
+# the parse and index jobs started by uploads
+ingestion_jobs.register(
+    "generate_journal",
+    run_journal_generation,
+    concurrency=int(os.getenv("JOURNAL_JOB_CONCURRENCY", "1")),
+)
+
+
+class ChatFilters(BaseModel):
+    # Narrows retrieval to matching documents; the date range is inclusive
+    bills: Optional[List[str]] = None
+    congress: Optional[int] = None
+    document_type: Optional[str] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
 
 
 class ChatRequest(BaseModel):
     question: str
     system_type: str = "general"
     pdf_content: Optional[List[str]] = None
+    document_id: Optional[str] = None
+    filters: Optional[ChatFilters] = None
+
+    def filter_params(self) -> Optional[Dict[str, Any]]:
+        if self.filters is None:
+            return None
+        # Dates as ISO strings, the form they are stored in
+        return self.filters.model_dump(mode="json", exclude_none=True)
+
+
+async def resolve_index_id(request: ChatRequest) -> Optional[str]:
+    # Only journal chats have per-document indexes; general chats always
+    # query the shared collection (and can use the answer cache)
+    if request.system_type == "journal" and request.document_id:
+        return await ensure_document_index(request.document_id)
+    return None
 
 
 @app.post("/api/chat")
 async def chat(request: ChatRequest):
-    rag = rag_systems.get(request.system_type)
-    if not rag:
-        raise HTTPException(status_code=400, detail="Invalid system type.")
+    rag = await get_system(request.system_type)
     if request.system_type == "journal" and request.pdf_content:
-        # If both conditions are true, return the default output
-        return {"response": JOURNAL_OUTPUT, "sources": []}
-    response = rag.query(request.question)
-    return {"response": response, "sources": rag.get_relevant_nodes(request.question)}
+        # Transcript posted inline: generate its journal
+        journal = await rag.agenerate_journal(request.pdf_content)
+        return {"response": journal, "sources": []}
+    index_id = await resolve_index_id(request)
+    return await rag.aquery_with_sources(
+        request.question, index_id=index_id, filters=request.filter_params())
+
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest):
+    rag = await get_system(request.system_type)
+    index_id = await resolve_index_id(request)
+
+    async def generated_journal():
+        yield {"type": "token", "content": await rag.agenerate_journal(request.pdf_content)}
+        yield {"type": "sources", "sources": []}
+
+    async def frames():
+        if request.system_type == "journal" and request.pdf_content:
+            events = generated_journal()
+        else:
+            events = rag.astream_query(
+                request.question, index_id=index_id, filters=request.filter_params())
+        try:
+            async for event in events:
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            # Headers are already sent, so report failures in-band
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+            return
+        yield json.dumps({"type": "done"}) + "\n"
+
+    # Newline-delimited JSON, one frame per token
+    return StreamingResponse(frames(), media_type="application/x-ndjson")
 
 
 @app.post("/api/upload-pdf")
 async def upload_pdf(file: UploadFile = File(...)):
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-        content = await file.read()
-        temp_file.write(content)
-        # Assume LlamaParse is imported and used here
-        parser = LlamaParse(result_type="markdown")
-        documents = await parser.aload_data(temp_file.name)
-        parsed_content = [doc.text for doc in documents]
-    return {"content": parsed_content}
+    try:
+        async with spool_upload(file, MAX_UPLOAD_BYTES, directory=UPLOAD_TMP_DIR) as path:
+            parsed_content = await parse_pdf(path)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    document_id = await run_blocking(documents.save, parsed_content, filename=file.filename)
+    # Start indexing now so the first question does not pay for it
+    schedule_document_index(document_id, parsed_content)
+    return {
+        "document_id": document_id,
+        "filename": file.filename,
+        "pages": len(parsed_content),
+    }
+
+
+@app.get("/api/documents/{document_id}")
+async def get_document(document_id: str):
+    if not documents.exists(document_id):
+        raise HTTPException(status_code=404, detail="Unknown document ID.")
+    rag = rag_systems.peek("journal")
+    return {
+        **await run_blocking(documents.metadata, document_id),
+        "indexing": document_id in index_builds,
+        "indexed": rag is not None and document_id in rag.journal_indexes,
+    }
+
+
+@app.post("/api/ingest")
+async def submit_ingestion(file: UploadFile = File(...)):
+    try:
+        path = await save_upload(file, MAX_UPLOAD_BYTES, directory=JOBS_UPLOAD_DIR)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    job = ingestion_jobs.submit("ingest_pdf", {"path": path, "filename": file.filename})
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await run_blocking(ingestion_jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job ID.")
+    job["params"] = {"filename": job["params"].get("filename")}
+    return job
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = await run_blocking(ingestion_jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job ID.")
+    if not ingestion_jobs.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job is already {job['status']}.")
+    if job["kind"] == "ingest_pdf" and job["status"] == QUEUED:
+        # Never reached a worker, so nothing else will clean up the upload
+        try:
+            os.remove(job["params"]["path"])
+        except FileNotFoundError:
+            pass
+    return {"job_id": job_id, "status": "cancelled"}
+
+
+class JournalRequest(BaseModel):
+    document_id: str
+
+
+@app.post("/api/journal/generate")
+async def generate_journal(request: JournalRequest):
+    if not documents.exists(request.document_id):
+        raise HTTPException(status_code=404, detail="Unknown document ID.")
+    job = ingestion_jobs.submit("generate_journal", {"document_id": request.document_id})
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.get("/api/journal/metrics")
+async def journal_metrics():
+    rag = await get_system("journal")
+    return rag.journal_indexes.metrics()
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    # Collectors query SQLite-backed caches, so keep them off the event loop
+    body = await run_blocking(metrics.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+@app.get("/healthz")
+async def liveness():
+    # The process is up and serving; says nothing about the backends
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readiness():
+    systems = rag_systems.status()
+    ready = rag_systems.ready(READINESS_SYSTEMS)
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "systems": systems},
+    )
+
+
+def resolve_bill(bill: str) -> str:
+    # Accepts "sb2654" as well as "SB 2654" or "Senate Bill No. 2654"
+    identifiers = extract_identifiers(bill)
+    return identifiers[0] if identifiers else bill.lower().replace(" ", "")
+
+
+@app.get("/api/bills/{bill}/timeline")
+async def get_bill_timeline(bill: str):
+    timeline = await run_blocking(bill_timelines.timeline, resolve_bill(bill))
+    if timeline is None:
+        raise HTTPException(status_code=404, detail="No documents found for this bill.")
+    return timeline
+
+
+class BillQuestion(BaseModel):
+    question: str
+
+
+@app.post("/api/bills/ask")
+async def ask_about_bills(request: BillQuestion):
+    # Aging and "what changed" questions are answered from the precomputed
+    # timelines; the LLM only phrases the result
+    bills = list(dict.fromkeys(extract_identifiers(request.question)))
+    if not bills:
+        raise HTTPException(status_code=400, detail="The question does not name a bill.")
+    timelines = [
+        timeline for timeline in await asyncio.gather(
+            *(run_blocking(bill_timelines.timeline, bill) for bill in bills))
+        if timeline is not None
+    ]
+    if not timelines:
+        raise HTTPException(status_code=404, detail="No documents found for these bills.")
+    context, sources = format_timelines(timelines)
+    rag = await get_system("general")
+    response = await rag.llm.acomplete(TIMELINE_PROMPT.format(
+        today=date.today().isoformat(), timelines=context, question=request.question))
+    return {"response": response.text, "sources": sources, "timelines": timelines}
 
 
 @app.get("/api/systems")
@@ -0,0 +1,33 @@
+from blocking import run_blocking
+from llama_index.core.vector_stores.types import VectorStoreQuery, VectorStoreQueryResult
+from llama_index.vector_stores.astra import AstraDBVectorStore
+from typing import Any, Dict
+
+
+class AstraVectorStore(AstraDBVectorStore):
+    # The stock store deletes "by document" with deleteOne on _id, but rows
+    # are keyed by their random node IDs, so it never matches anything.
+    # Delete by metadata instead; rows keep the node's metadata flat. It also
+    # has no async query, and the base class's fallback would make the HTTP
+    # round trip on the event loop.
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "AstraVectorStore"
+
+    def _delete_matching(self, filter: Dict[str, Any]) -> None:
+        # deleteMany removes a bounded number of rows per call and reports
+        # whether more matched
+        while True:
+            response = self.client.delete_many(filter=filter)
+            if not (response.get("status") or {}).get("moreData"):
+                return
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        self._delete_matching({"metadata.ref_doc_id": ref_doc_id})
+
+    def delete_where(self, key: str, value: Any) -> None:
+        self._delete_matching({f"metadata.{key}": value})
+
+    async def aquery(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        return await run_blocking(self.query, query, **kwargs)
@@ -0,0 +1,322 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+import uvicorn
+
+from fake_services import FakeParser, FaultConfig, create_openai_app, fake_embedding, fake_text
+
+# Benchmarks run the real app and RAG code against local stand-ins: a fake
+# OpenAI server (embeddings and streaming chat), an on-disk LocalVectorStore in
+# place of Astra, and a fake parser in place of LlamaParse. Nothing leaves the
+# machine, so runs are free and comparable across changes.
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ServerThread:
+    # A uvicorn server on a background thread, for the fake API and the app
+
+    def __init__(self, app, port: int):
+        self.port = port
+        self.server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> "ServerThread":
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError(f"Server on port {self.port} failed to start.")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=30)
+
+
+def configure_environment(args: argparse.Namespace, workdir: str, openai_port: int) -> None:
+    # app.py reads its configuration at import, so this must run first
+    base_url = f"http://127.0.0.1:{openai_port}/v1"
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_API_BASE": base_url,
+        "OPENAI_BASE_URL": base_url,
+        "LLAMA_CLOUD_API_KEY": "llx-benchmark",
+        "GENERAL_VECTOR_STORE": "local",
+        "GENERAL_LOCAL_STORE_PATH": os.path.join(workdir, "general_index"),
+        "GENERAL_LEXICAL_INDEX_PATH": os.path.join(workdir, "general_lexical.jsonl"),
+        "GENERAL_INGEST_MANIFEST": os.path.join(workdir, "general_manifest.json"),
+        "GENERAL_RETRIEVAL_MODE": args.retrieval_mode,
+        "JOURNAL_RETRIEVAL_MODE": args.retrieval_mode,
+        "JOURNAL_LOCAL_STORE_PATH": os.path.join(workdir, "journal_indexes"),
+        "JOURNAL_GENERATION_CACHE_PATH": os.path.join(workdir, "journal_segments.sqlite3"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embeddings.sqlite3") if args.embedding_cache else "",
+        "ANSWER_CACHE_SIZE": "1024" if args.answer_cache else "0",
+        "DOCUMENT_STORE_PATH": os.path.join(workdir, "documents"),
+        "BILL_TIMELINE_PATH": os.path.join(workdir, "bill_timelines.sqlite3"),
+        "JOBS_DB_PATH": os.path.join(workdir, "jobs.sqlite3"),
+        "JOBS_UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "UPLOAD_TMP_DIR": workdir,
+        "TIMING_HEADERS": "false",
+    })
+
+
+def seed_general_store(workdir: str, node_count: int) -> None:
+    from lexical import LexicalIndex
+    from llama_index.core.schema import TextNode
+    from local_vector_store import LocalVectorStore
+    from rag import EMBEDDING_DIMENSION
+
+    store = LocalVectorStore(os.environ["GENERAL_LOCAL_STORE_PATH"], EMBEDDING_DIMENSION)
+    lexical = LexicalIndex()
+    batch = []
+    for i in range(node_count):
+        text = f"Senate Bill No. {1000 + i % 200}. " + fake_text(f"corpus:{i}", 120)
+        node = TextNode(
+            text=text,
+            metadata={"document_title": f"Benchmark document {i // 20}"},
+            embedding=fake_embedding(text).tolist(),
+        )
+        batch.append(node)
+        if len(batch) == 500:
+            store.add(batch)
+            lexical.add_nodes(batch)
+            batch = []
+    store.add(batch)
+    lexical.add_nodes(batch)
+    lexical.save(os.environ["GENERAL_LEXICAL_INDEX_PATH"])
+
+
+def summarize(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    array = np.asarray(values) * 1000
+    return {
+        "p50": round(float(np.percentile(array, 50)), 2),
+        "p95": round(float(np.percentile(array, 95)), 2),
+        "p99": round(float(np.percentile(array, 99)), 2),
+        "mean": round(float(array.mean()), 2),
+        "max": round(float(array.max()), 2),
+    }
+
+
+class Sample:
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.ttft: Optional[float] = None
+        self.error: Optional[str] = None
+
+
+Request = Callable[[httpx.AsyncClient, int, Sample], Awaitable[None]]
+
+
+async def chat_request(client: httpx.AsyncClient, i: int, sample: Sample) -> None:
+    response = await client.post("/api/chat", json={
+        "question": f"What did the committee report say about term{i % 500}?",
+        "system_type": "general",
+    })
+    if response.status_code >= 400:
+        sample.error = f"HTTP {response.status_code}"
+
+
+async def stream_request(client: httpx.AsyncClient, i: int, sample: Sample) -> None:
+    started = time.perf_counter()
+    async with client.stream("POST", "/api/chat/stream", json={
+        "question": f"How was term{i % 500} amended on second reading?",
+        "system_type": "general",
+    }) as response:
+        if response.status_code >= 400:
+            sample.error = f"HTTP {response.status_code}"
+            return
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            frame = json.loads(line)
+            if frame["type"] == "token" and sample.ttft is None:
+                sample.ttft = time.perf_counter() - started
+            elif frame["type"] == "error":
+                sample.error = frame["detail"]
+
+
+async def upload_request(client: httpx.AsyncClient, i: int, sample: Sample) -> None:
+    # Unique bytes per request, so every upload is a new document to index
+    content = b"%PDF-1.4\n% benchmark " + f"{i}:{time.time_ns()}".encode() + b"\n%%EOF\n"
+    response = await client.post(
+        "/api/upload-pdf", files={"file": (f"benchmark-{i}.pdf", content, "application/pdf")})
+    if response.status_code >= 400:
+        sample.error = f"HTTP {response.status_code}"
+
+
+SCENARIOS: Dict[str, Request] = {
+    "chat": chat_request,
+    "stream": stream_request,
+    "upload": upload_request,
+}
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    request: Request,
+    total: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    samples = [Sample() for _ in range(total)]
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < total:
+            i = next_index
+            next_index += 1
+            sample = samples[i]
+            started = time.perf_counter()
+            try:
+                await request(client, i, sample)
+            except Exception as e:
+                sample.error = f"{type(e).__name__}: {e}"
+            sample.latency = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    succeeded = [s for s in samples if s.error is None]
+    errors: Dict[str, int] = {}
+    for s in samples:
+        if s.error is not None:
+            errors[s.error] = errors.get(s.error, 0) + 1
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "succeeded": len(succeeded),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(succeeded) / elapsed, 2) if elapsed else None,
+        "latency_ms": summarize([s.latency for s in succeeded]),
+        "ttft_ms": summarize([s.ttft for s in succeeded if s.ttft is not None]),
+    }
+
+
+_STAGE_PATTERN = re.compile(r'^rag_stage_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$', re.M)
+
+
+def stage_means(metrics_text: str) -> Dict[str, Dict[str, float]]:
+    # Mean per-stage time from the app's own /metrics, to show where it went
+    totals: Dict[str, Dict[str, float]] = {}
+    for kind, stage, value in _STAGE_PATTERN.findall(metrics_text):
+        totals.setdefault(stage, {})[kind] = float(value)
+    return {
+        stage: {"count": int(t["count"]), "mean_ms": round(1000 * t["sum"] / t["count"], 2)}
+        for stage, t in sorted(totals.items()) if t.get("count")
+    }
+
+
+async def drive(args: argparse.Namespace, app_port: int) -> Dict[str, Any]:
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{app_port}",
+        timeout=args.timeout,
+        limits=httpx.Limits(max_connections=args.concurrency),
+    ) as client:
+        deadline = time.monotonic() + args.timeout
+        while True:
+            ready = await client.get("/readyz")
+            if ready.status_code == 200:
+                break
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"App never became ready: {ready.text}")
+            await asyncio.sleep(0.1)
+
+        results: Dict[str, Any] = {}
+        for name in args.scenarios:
+            if args.warmup_requests:
+                await run_scenario(client, SCENARIOS[name], args.warmup_requests, args.concurrency)
+            results[name] = await run_scenario(
+                client, SCENARIOS[name], args.requests, args.concurrency)
+        results["stages"] = stage_means((await client.get("/metrics")).text)
+        return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the backend against local fake OpenAI, vector store and parser.")
+    parser.add_argument("--scenarios", default="chat,stream,upload",
+                        type=lambda value: [s for s in value.split(",") if s],
+                        help=f"Comma-separated, from: {', '.join(SCENARIOS)}.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario.")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup-requests", type=int, default=10)
+    parser.add_argument("--corpus-nodes", type=int, default=5000,
+                        help="Nodes seeded into the general vector store.")
+    parser.add_argument("--embed-latency-ms", type=float, default=50)
+    parser.add_argument("--llm-first-token-ms", type=float, default=300)
+    parser.add_argument("--llm-token-ms", type=float, default=10)
+    parser.add_argument("--response-tokens", type=int, default=200)
+    parser.add_argument("--parse-latency-ms", type=float, default=1000)
+    parser.add_argument("--parse-pages", type=int, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of fake API and parser calls that fail.")
+    parser.add_argument("--retrieval-mode", choices=["vector", "hybrid"], default="hybrid")
+    parser.add_argument("--embedding-cache", action="store_true")
+    parser.add_argument("--answer-cache", action="store_true")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main() -> None:
+    args = parse_args()
+    config = FaultConfig(
+        embed_latency=args.embed_latency_ms / 1000,
+        llm_first_token_latency=args.llm_first_token_ms / 1000,
+        llm_token_latency=args.llm_token_ms / 1000,
+        response_tokens=args.response_tokens,
+        parse_latency=args.parse_latency_ms / 1000,
+        parse_pages=args.parse_pages,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    with tempfile.TemporaryDirectory(prefix="rag-benchmark-") as workdir:
+        openai_port, app_port = free_port(), free_port()
+        configure_environment(args, workdir, openai_port)
+        seed_general_store(workdir, args.corpus_nodes)
+
+        import ingestion
+        ingestion._parser = FakeParser(config)
+        from app import app
+
+        with ServerThread(create_openai_app(config), openai_port), ServerThread(app, app_port):
+            results = asyncio.run(drive(args, app_port))
+
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+from collections import Counter
+from datetime import date, datetime
+from identifiers import extract_identifiers
+from typing import Any, Dict, List, Optional, Tuple
+import difflib
+import json
+import os
+import re
+import sqlite3
+import threading
+
+_MONTHS = (
+    "january|february|march|april|may|june|july|august|september|october|november|december"
+)
+_DATE_PATTERNS = [
+    (re.compile(rf"\b({_MONTHS})\s+(\d{{1,2}}),?\s+(\d{{4}})\b", re.IGNORECASE), "%B %d %Y"),
+    (re.compile(rf"\b(\d{{1,2}})\s+({_MONTHS})\s+(\d{{4}})\b", re.IGNORECASE), "%d %B %Y"),
+    (re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b"), "%Y %m %d"),
+]
+# "SECTION 1.", "Sec. 12", "## SEC. 3" at the start of a line
+_SECTION_PATTERN = re.compile(r"^\s*(?:#+\s*)?sec(?:tion)?\.?\s*(\d+)\b", re.IGNORECASE | re.MULTILINE)
+# Front matter of an actual bill or resolution, as opposed to a paper about one
+_VERSION_MARKERS = re.compile(
+    r"\ban act\b|\bintroduced by\b|\bexplanatory note\b|\bresolved\b|\bsubstitute bill\b",
+    re.IGNORECASE,
+)
+MAX_DIFF_LINES = 40
+# Diff lines per changed section shown to the LLM when phrasing an answer
+PROMPT_DIFF_LINES = 12
+
+TIMELINE_PROMPT = """
+    Answer the question using only the bill timelines below. Each timeline lists, in date order,
+    every ingested document that names the bill; for successive versions of the bill text it
+    lists the sections that were added, removed or modified. Today is {today}.
+
+    {timelines}
+
+    Question: {question}
+"""
+
+
+def extract_date(text: str) -> Optional[str]:
+    # The earliest-positioned date in the text, as ISO YYYY-MM-DD
+    found: List[Tuple[int, str]] = []
+    for pattern, layout in _DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            try:
+                parsed = datetime.strptime(" ".join(match.groups()), layout).date()
+            except ValueError:
+                continue
+            found.append((match.start(), parsed.isoformat()))
+    return min(found)[1] if found else None
+
+
+def split_sections(text: str) -> Dict[str, str]:
+    # Section number -> body; whatever precedes the first section is "preamble"
+    sections: Dict[str, str] = {}
+    matches = list(_SECTION_PATTERN.finditer(text))
+    preamble = text[:matches[0].start()] if matches else text
+    if preamble.strip():
+        sections["preamble"] = preamble.strip()
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        key = f"section {int(match.group(1))}"
+        # Repeated numbers (quoted amendments) are kept with the first occurrence
+        sections[key] = (sections.get(key, "") + "\n" + text[match.start():end]).strip()
+    return sections
+
+
+def diff_sections(old: Dict[str, str], new: Dict[str, str]) -> Dict[str, Any]:
+    added = [key for key in new if key not in old]
+    removed = [key for key in old if key not in new]
+    modified = []
+    for key in new:
+        if key in old and old[key] != new[key]:
+            lines = list(difflib.unified_diff(
+                old[key].splitlines(), new[key].splitlines(), lineterm="", n=0))[2:]
+            modified.append({
+                "section": key,
+                "similarity": round(difflib.SequenceMatcher(None, old[key], new[key]).ratio(), 3),
+                "diff": lines[:MAX_DIFF_LINES],
+                "truncated": len(lines) > MAX_DIFF_LINES,
+            })
+    return {"added": added, "removed": removed, "modified": modified}
+
+
+class BillTimelineStore:
+    # Per-bill timelines built at ingestion: every document that names a bill
+    # is recorded under it with its date, and successive versions of the bill
+    # text get precomputed section-level diffs
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " bill TEXT NOT NULL, source TEXT NOT NULL, title TEXT, date TEXT,"
+            " kind TEXT NOT NULL, sections TEXT NOT NULL, PRIMARY KEY (bill, source));"
+            "CREATE TABLE IF NOT EXISTS diffs ("
+            " bill TEXT NOT NULL, from_source TEXT NOT NULL, to_source TEXT NOT NULL,"
+            " diff TEXT NOT NULL, PRIMARY KEY (bill, from_source, to_source));"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def classify(pages: List[str]) -> Tuple[List[str], str]:
+        # Bills named on the first page, most mentioned first, and whether the
+        # document is a version of them or only about them
+        front = pages[0] if pages else ""
+        bills = [bill for bill, _ in Counter(extract_identifiers(front)).most_common()]
+        return bills, "version" if _VERSION_MARKERS.search(front) else "related"
+
+    def add_document(self, source: str, title: str, pages: List[str]) -> List[str]:
+        # Replaces anything previously recorded for this source; returns the
+        # bills whose timelines changed
+        bills, kind = self.classify(pages)
+        text = "\n\n".join(pages)
+        version_date = extract_date(pages[0] if pages else "") or extract_date(title)
+        sections = json.dumps(split_sections(text) if kind == "version" else {})
+        with self._lock:
+            affected = self._bills_for(source)
+            self._conn.execute("DELETE FROM documents WHERE source = ?", (source,))
+            self._conn.executemany(
+                "INSERT INTO documents (bill, source, title, date, kind, sections)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(bill, source, title, version_date, kind, sections) for bill in bills],
+            )
+            affected = sorted(set(affected) | set(bills))
+            for bill in affected:
+                self._rebuild_diffs(bill)
+            self._conn.commit()
+        return affected
+
+    def remove_document(self, source: str) -> List[str]:
+        with self._lock:
+            affected = self._bills_for(source)
+            self._conn.execute("DELETE FROM documents WHERE source = ?", (source,))
+            for bill in affected:
+                self._rebuild_diffs(bill)
+            self._conn.commit()
+        return affected
+
+    def _bills_for(self, source: str) -> List[str]:
+        rows = self._conn.execute("SELECT bill FROM documents WHERE source = ?", (source,))
+        return [row[0] for row in rows]
+
+    def _rows(self, bill: str) -> List[Dict[str, Any]]:
+        rows = self._conn.execute(
+            "SELECT source, title, date, kind, sections FROM documents WHERE bill = ?", (bill,))
+        entries = [
+            {"source": source, "title": title, "date": date_, "kind": kind,
+             "sections": json.loads(sections)}
+            for source, title, date_, kind, sections in rows
+        ]
+        # Undated documents sort last; source breaks ties deterministically
+        entries.sort(key=lambda e: (e["date"] is None, e["date"] or "", e["source"]))
+        return entries
+
+    def _rebuild_diffs(self, bill: str) -> None:
+        self._conn.execute("DELETE FROM diffs WHERE bill = ?", (bill,))
+        versions = [e for e in self._rows(bill) if e["kind"] == "version"]
+        self._conn.executemany(
+            "INSERT INTO diffs (bill, from_source, to_source, diff) VALUES (?, ?, ?, ?)",
+            [
+                (bill, old["source"], new["source"],
+                 json.dumps(diff_sections(old["sections"], new["sections"])))
+                for old, new in zip(versions, versions[1:])
+            ],
+        )
+
+    def bills(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT bill FROM documents ORDER BY bill")
+            return [row[0] for row in rows]
+
+    def timeline(self, bill: str, today: Optional[date] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entries = self._rows(bill)
+            diffs = {
+                (from_source, to_source): json.loads(diff)
+                for from_source, to_source, diff in self._conn.execute(
+                    "SELECT from_source, to_source, diff FROM diffs WHERE bill = ?", (bill,))
+            }
+        if not entries:
+            return None
+        events = []
+        previous_version = None
+        for entry in entries:
+            event = {key: entry[key] for key in ("source", "title", "date", "kind")}
+            if entry["kind"] == "version":
+                event["sections"] = len(entry["sections"])
+                if previous_version is not None:
+                    event["changes"] = diffs.get((previous_version, entry["source"]))
+                previous_version = entry["source"]
+            events.append(event)
+        dates = [e["date"] for e in entries if e["date"]]
+        today = today or date.today()
+        aging = None
+        if dates:
+            first, last = date.fromisoformat(dates[0]), date.fromisoformat(dates[-1])
+            aging = {
+                "first_seen": dates[0],
+                "last_activity": dates[-1],
+                "days_pending": (today - first).days,
+                "days_since_last_activity": (today - last).days,
+            }
+        return {
+            "bill": bill,
+            "versions": sum(1 for e in entries if e["kind"] == "version"),
+            "documents": len(entries),
+            "aging": aging,
+            "events": events,
+        }
+
+
+def format_timelines(timelines: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
+    # Prompt text with one numbered source per document, and those sources
+    blocks = []
+    sources: List[Dict[str, Any]] = []
+    for timeline in timelines:
+        lines = [f"## {timeline['bill'].upper()}"]
+        aging = timeline["aging"]
+        if aging:
+            lines.append(
+                f"First seen {aging['first_seen']}, last activity {aging['last_activity']} "
+                f"({aging['days_pending']} days pending, "
+                f"{aging['days_since_last_activity']} days since last activity).")
+        for event in timeline["events"]:
+            sources.append({"text": event["title"], "score": None, "metadata": event})
+            lines.append(
+                f"[{len(sources)}] {event['date'] or 'undated'}: {event['title']} ({event['kind']})")
+            changes = event.get("changes")
+            if not changes:
+                continue
+            if changes["added"]:
+                lines.append(f"    Added: {', '.join(changes['added'])}")
+            if changes["removed"]:
+                lines.append(f"    Removed: {', '.join(changes['removed'])}")
+            for change in changes["modified"]:
+                lines.append(f"    Modified {change['section']}:")
+                lines.extend(f"        {line}" for line in change["diff"][:PROMPT_DIFF_LINES])
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks), sources
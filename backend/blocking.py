@@ -0,0 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+import asyncio
+import contextvars
+import os
+
+# Work that has no async equivalent (index builds, sync-only streaming) runs
+# here so it never blocks the event loop, and never spawns unbounded threads
+_blocking_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RAG_BLOCKING_THREADS", "8")),
+    thread_name_prefix="rag-blocking",
+)
+
+
+async def run_blocking(func: Callable, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    # Carry context variables (per-request timings) into the worker thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_blocking_pool, lambda: context.run(func, *args, **kwargs))
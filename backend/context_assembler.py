@@ -0,0 +1,137 @@
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle, TextNode
+from llama_index.core.utils import get_tokenizer
+from telemetry import metrics
+from typing import Callable, Dict, List, Optional
+import hashlib
+
+# Longest overlap searched for when character offsets are missing or disagree;
+# SentenceSplitter's 50-token overlap is well under this
+MAX_OVERLAP_CHARS = 1000
+MIN_OVERLAP_CHARS = 20
+
+
+def _overlap(left: str, right: str, hint: Optional[int] = None) -> int:
+    # Length of the longest suffix of left that is a prefix of right
+    if hint and 0 < hint <= min(len(left), len(right)) and left.endswith(right[:hint]):
+        return hint
+    for size in range(min(len(left), len(right), MAX_OVERLAP_CHARS), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+class ContextAssembler(BaseNodePostprocessor):
+    # Runs between retrieval and synthesis: drops duplicate chunks, stitches
+    # overlapping or adjacent chunks of the same document back into one span,
+    # and packs the result, most relevant first, into token_budget tokens.
+    # Ties are broken by node ID so equal retrievals give byte-identical
+    # prompts, and everything variable stays after the fixed system prompt.
+
+    token_budget: Optional[int] = 3000
+    max_gap_chars: int = 2
+
+    _tokenizer: Callable[[str], List] = PrivateAttr()
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._tokenizer = get_tokenizer()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ContextAssembler"
+
+    def _tokens(self, node: NodeWithScore) -> int:
+        return len(self._tokenizer(node.node.get_content(metadata_mode=MetadataMode.LLM)))
+
+    @staticmethod
+    def _dedupe(nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        best: Dict[str, NodeWithScore] = {}
+        for node in nodes:
+            text = " ".join(node.node.get_content().split())
+            key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            if key not in best or (node.score or 0) > (best[key].score or 0):
+                best[key] = node
+        return list(best.values())
+
+    def _merge(self, nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        spans: Dict[str, List[NodeWithScore]] = {}
+        merged: List[NodeWithScore] = []
+        for node in nodes:
+            inner = node.node
+            if (
+                isinstance(inner, TextNode)
+                and inner.ref_doc_id
+                and inner.start_char_idx is not None
+                and inner.end_char_idx is not None
+            ):
+                spans.setdefault(inner.ref_doc_id, []).append(node)
+            else:
+                merged.append(node)
+        for group in spans.values():
+            group.sort(key=lambda n: n.node.start_char_idx)
+            current = group[0]
+            for node in group[1:]:
+                joined = self._join(current, node)
+                if joined is None:
+                    merged.append(current)
+                    current = node
+                else:
+                    current = joined
+            merged.append(current)
+        return merged
+
+    def _join(self, left: NodeWithScore, right: NodeWithScore) -> Optional[NodeWithScore]:
+        gap = right.node.start_char_idx - left.node.end_char_idx
+        if gap > self.max_gap_chars:
+            return None
+        left_text, right_text = left.node.get_content(), right.node.get_content()
+        if gap >= 0:
+            text = left_text + ("\n" if gap else "") + right_text
+        else:
+            if right.node.end_char_idx <= left.node.end_char_idx and right_text in left_text:
+                text = left_text  # Entirely contained
+            else:
+                overlap = _overlap(left_text, right_text, hint=-gap)
+                if not overlap:
+                    return None  # Offsets say they overlap but the text disagrees
+                text = left_text + right_text[overlap:]
+        node = left.node.model_copy()
+        node.set_content(text)
+        node.end_char_idx = max(left.node.end_char_idx, right.node.end_char_idx)
+        return NodeWithScore(node=node, score=max(left.score or 0, right.score or 0))
+
+    def _pack(self, nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        if self.token_budget is None:
+            return nodes
+        packed: List[NodeWithScore] = []
+        remaining = self.token_budget
+        for node in nodes:
+            tokens = self._tokens(node)
+            if tokens <= remaining:
+                packed.append(node)
+                remaining -= tokens
+            elif not packed:
+                # The single best span alone is over budget: keep its head
+                truncated = node.node.model_copy()
+                text = truncated.get_content()
+                truncated.set_content(text[:len(text) * remaining // tokens])
+                packed.append(NodeWithScore(node=truncated, score=node.score))
+                remaining = 0
+        return packed
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        if not nodes:
+            return nodes
+        retrieved = sum(self._tokens(node) for node in nodes)
+        assembled = self._merge(self._dedupe(nodes))
+        assembled.sort(key=lambda n: (-(n.score or 0), n.node.node_id))
+        packed = self._pack(assembled)
+        metrics.inc("context_tokens_total", retrieved, kind="retrieved")
+        metrics.inc("context_tokens_total", sum(self._tokens(node) for node in packed), kind="packed")
+        return packed
@@ -0,0 +1,241 @@
+from bill_timeline import extract_date
+from dataclasses import dataclass, field
+from identifiers import extract_identifiers
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.vector_stores.types import (
+    FilterCondition,
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+)
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import itertools
+import re
+
+_ORDINALS = [
+    "first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth", "ninth",
+    "tenth", "eleventh", "twelfth", "thirteenth", "fourteenth", "fifteenth", "sixteenth",
+    "seventeenth", "eighteenth", "nineteenth", "twentieth",
+]
+_CONGRESS_PATTERN = re.compile(
+    r"\b(?:(twenty-)?(" + "|".join(_ORDINALS) + r")|(\d{1,2})(?:st|nd|rd|th))\s+congress\b",
+    re.IGNORECASE,
+)
+# (type, pattern) checked against the title first, then the first page
+_DOCUMENT_TYPES = [
+    ("position_paper", re.compile(r"\bposition\s+paper\b", re.IGNORECASE)),
+    ("committee_report", re.compile(r"\bcommittee\s+report\b", re.IGNORECASE)),
+    ("journal", re.compile(r"\bjournal\b", re.IGNORECASE)),
+    ("transcript", re.compile(r"\btranscript\b|\bstenographic\b", re.IGNORECASE)),
+    ("republic_act", re.compile(r"\brepublic\s+act\b", re.IGNORECASE)),
+    ("resolution", re.compile(r"\bresolution\b", re.IGNORECASE)),
+    ("bill", re.compile(r"\ban act\b|\bsenate\s+bill\b|\bhouse\s+bill\b", re.IGNORECASE)),
+]
+# Filter-only fields, kept out of the embedded text and the LLM prompt
+BILL_FLAG_PREFIX = "bill_"
+HIDDEN_KEYS = ["bills", "congress", "document_type", "date", "year"]
+# Positional fields, shown to the LLM but never embedded: otherwise inserting
+# a page changes every later chunk's embedding cache key
+EMBED_HIDDEN_KEYS = ["page"]
+# Equality-only stores answer an OR of bills, or a date range, as one query
+# per bill and year; past this many queries the years are post-filtered
+MAX_FILTER_QUERIES = 8
+
+
+def extract_congress(text: str) -> Optional[int]:
+    match = _CONGRESS_PATTERN.search(text)
+    if match is None:
+        return None
+    if match.group(3):
+        return int(match.group(3))
+    number = _ORDINALS.index(match.group(2).lower()) + 1
+    return number + 20 if match.group(1) else number
+
+
+def classify_document_type(title: str, front: str) -> str:
+    for text in (title, front[:2000]):
+        for document_type, pattern in _DOCUMENT_TYPES:
+            if pattern.search(text):
+                return document_type
+    return "other"
+
+
+def bill_metadata(text: str) -> Dict[str, Any]:
+    # Bills as one flag key each: stores with flat metadata and
+    # equality-only filters (Astra) can still select by bill. The flag is 1,
+    # not True: MetadataFilter only accepts strict int, float or str values.
+    bills = list(dict.fromkeys(extract_identifiers(text)))
+    metadata: Dict[str, Any] = {f"{BILL_FLAG_PREFIX}{bill}": 1 for bill in bills}
+    metadata["bills"] = " ".join(bills)
+    return metadata
+
+
+def extract_metadata(title: str, pages: List[str]) -> Dict[str, Any]:
+    # Structured, filterable metadata for a whole document, from its first page
+    front = pages[0] if pages else ""
+    metadata: Dict[str, Any] = {
+        "document_title": title,
+        "document_type": classify_document_type(title, front),
+        **bill_metadata(front),
+    }
+    found_date = extract_date(front) or extract_date(title)
+    if found_date is not None:
+        metadata["date"] = found_date
+        # Date ranges become year equality on stores without range filters
+        metadata["year"] = int(found_date[:4])
+    congress = extract_congress(front) or extract_congress(title)
+    if congress is not None:
+        metadata["congress"] = congress
+    return metadata
+
+
+def hidden_keys(metadata: Dict[str, Any], embed: bool = False) -> List[str]:
+    keys = HIDDEN_KEYS + (EMBED_HIDDEN_KEYS if embed else [])
+    return keys + [key for key in metadata if key.startswith(BILL_FLAG_PREFIX)]
+
+
+@dataclass
+class RetrievalFilters:
+    bills: List[str] = field(default_factory=list)
+    congress: Optional[int] = None
+    document_type: Optional[str] = None
+    date_from: Optional[str] = None  # ISO dates, inclusive
+    date_to: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, filters: Optional[Dict[str, Any]]) -> Optional["RetrievalFilters"]:
+        if not filters:
+            return None
+        bills = []
+        for bill in filters.get("bills") or []:
+            # "SB 2654" and "sb2654" both name the same bill
+            bills.extend(extract_identifiers(bill) or [bill.lower().replace(" ", "")])
+        parsed = cls(
+            bills=list(dict.fromkeys(bills)),
+            congress=filters.get("congress"),
+            document_type=filters.get("document_type"),
+            date_from=filters.get("date_from"),
+            date_to=filters.get("date_to"),
+        )
+        return None if parsed.empty() else parsed
+
+    def empty(self) -> bool:
+        return not (self.bills or self.congress is not None or self.document_type
+                    or self.date_from or self.date_to)
+
+    def matches(self, metadata: Dict[str, Any]) -> bool:
+        if self.bills and not any(metadata.get(f"{BILL_FLAG_PREFIX}{b}") for b in self.bills):
+            return False
+        if self.congress is not None and metadata.get("congress") != self.congress:
+            return False
+        if self.document_type and metadata.get("document_type") != self.document_type:
+            return False
+        if self.date_from or self.date_to:
+            value = metadata.get("date")
+            if value is None:
+                return False
+            if self.date_from and value < self.date_from:
+                return False
+            if self.date_to and value > self.date_to:
+                return False
+        return True
+
+    def years(self) -> Optional[List[int]]:
+        # Every year a bounded date range touches; None when a bound is open
+        if not (self.date_from and self.date_to):
+            return None
+        return list(range(int(self.date_from[:4]), int(self.date_to[:4]) + 1))
+
+    def to_metadata_filters(
+        self, equality_only: bool = False
+    ) -> Tuple[List[Optional[MetadataFilters]], bool]:
+        # Store-side filter sets, one query each with the results merged, and
+        # whether they are exact. Equality-only stores get one query per bill
+        # and year, and the exact date bounds are applied after retrieval.
+        filters: List[Any] = []
+        if self.congress is not None:
+            filters.append(MetadataFilter(key="congress", value=self.congress))
+        if self.document_type:
+            filters.append(MetadataFilter(key="document_type", value=self.document_type))
+        bill_filters = [MetadataFilter(key=f"{BILL_FLAG_PREFIX}{b}", value=1) for b in self.bills]
+        if not equality_only:
+            if len(bill_filters) == 1:
+                filters.extend(bill_filters)
+            elif bill_filters:
+                filters.append(MetadataFilters(filters=bill_filters, condition=FilterCondition.OR))
+            for bound, operator in ((self.date_from, FilterOperator.GTE), (self.date_to, FilterOperator.LTE)):
+                if bound:
+                    filters.append(MetadataFilter(key="date", value=bound, operator=operator))
+            return [MetadataFilters(filters=filters) if filters else None], True
+
+        exact = not (self.date_from or self.date_to)
+        year_filters = [MetadataFilter(key="year", value=year) for year in self.years() or []]
+        if len(year_filters) * max(len(bill_filters), 1) > MAX_FILTER_QUERIES:
+            year_filters = []
+        alternatives = [
+            [*filters, *combination]
+            for combination in itertools.product(*(group for group in (bill_filters, year_filters) if group))
+        ]
+        return [MetadataFilters(filters=f) if f else None for f in alternatives], exact
+
+
+class MergedRetriever(BaseRetriever):
+    # Union of several filtered queries over one store, best score per node.
+    # The question is embedded once up front: the vector retrievers' async
+    # path embeds into a copy of the bundle, so each would embed it again.
+
+    def __init__(
+        self,
+        retrievers: List[BaseRetriever],
+        similarity_top_k: int,
+        embed_model: BaseEmbedding,
+    ):
+        super().__init__()
+        self.retrievers = retrievers
+        self.similarity_top_k = similarity_top_k
+        self.embed_model = embed_model
+
+    def _merge(self, results: List[List[NodeWithScore]]) -> List[NodeWithScore]:
+        best: Dict[str, NodeWithScore] = {}
+        for result in itertools.chain.from_iterable(results):
+            current = best.get(result.node.node_id)
+            if current is None or (result.score or 0.0) > (current.score or 0.0):
+                best[result.node.node_id] = result
+        ranked = sorted(best.values(), key=lambda n: n.score or 0.0, reverse=True)
+        return ranked[:self.similarity_top_k]
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = self.embed_model.get_agg_embedding_from_queries(
+                query_bundle.embedding_strs)
+        return self._merge([r.retrieve(query_bundle) for r in self.retrievers])
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = await self.embed_model.aget_agg_embedding_from_queries(
+                query_bundle.embedding_strs)
+        return self._merge(await asyncio.gather(
+            *(r.aretrieve(query_bundle) for r in self.retrievers)))
+
+
+class PostFilterRetriever(BaseRetriever):
+    # For filters the store could only partly apply: over-fetch, then keep
+    # the top similarity_top_k results that match exactly
+
+    def __init__(self, retriever: BaseRetriever, filters: RetrievalFilters, similarity_top_k: int):
+        super().__init__()
+        self.retriever = retriever
+        self.filters = filters
+        self.similarity_top_k = similarity_top_k
+
+    def _select(self, nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        return [n for n in nodes if self.filters.matches(n.node.metadata)][:self.similarity_top_k]
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._select(self.retriever.retrieve(query_bundle))
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._select(await self.retriever.aretrieve(query_bundle))
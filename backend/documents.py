@@ -0,0 +1,97 @@
+from typing import Any, Callable, Dict, List, Optional
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class DocumentStore:
+    # Parsed PDF content kept server-side under a content-addressed ID, so
+    # clients reference documents instead of resending them every turn
+
+    def __init__(
+        self,
+        directory: str,
+        max_documents: int = 500,
+        on_remove: Optional[Callable[[str], None]] = None,
+    ):
+        self.directory = directory
+        self.max_documents = max_documents
+        # Called with the ID of every deleted or evicted document, so data
+        # derived from it (its journal index) goes with it
+        self.on_remove = on_remove
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_id(content: List[str]) -> str:
+        return hashlib.sha256("\n".join(content).encode("utf-8")).hexdigest()
+
+    def _path(self, document_id: str) -> str:
+        # IDs are hex digests; anything else cannot name a stored document
+        if not document_id or not all(c in "0123456789abcdef" for c in document_id):
+            raise KeyError(document_id)
+        return os.path.join(self.directory, f"{document_id}.json")
+
+    def save(self, content: List[str], filename: Optional[str] = None) -> str:
+        document_id = self.make_id(content)
+        record = {
+            "document_id": document_id,
+            "filename": filename,
+            "pages": len(content),
+            "created_at": time.time(),
+            "content": content,
+        }
+        path = self._path(document_id)
+        with self._lock:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(record, f)
+            os.replace(tmp_path, path)
+            self._evict()
+        return document_id
+
+    def exists(self, document_id: str) -> bool:
+        try:
+            return os.path.exists(self._path(document_id))
+        except KeyError:
+            return False
+
+    def load(self, document_id: str) -> Dict[str, Any]:
+        with open(self._path(document_id), encoding="utf-8") as f:
+            record = json.load(f)
+        # Touch so eviction is least-recently-used rather than oldest-first
+        os.utime(self._path(document_id))
+        return record
+
+    def content(self, document_id: str) -> List[str]:
+        return self.load(document_id)["content"]
+
+    def metadata(self, document_id: str) -> Dict[str, Any]:
+        record = self.load(document_id)
+        record.pop("content")
+        return record
+
+    def delete(self, document_id: str) -> bool:
+        try:
+            os.remove(self._path(document_id))
+        except (KeyError, FileNotFoundError):
+            return False
+        if self.on_remove is not None:
+            self.on_remove(document_id)
+        return True
+
+    def _evict(self) -> None:
+        paths = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".json")
+        ]
+        if len(paths) <= self.max_documents:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:len(paths) - self.max_documents]:
+            os.remove(path)
+            if self.on_remove is not None:
+                self.on_remove(os.path.basename(path)[:-len(".json")])
@@ -0,0 +1,146 @@
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from telemetry import metrics
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
+
+Embedding = List[float]
+
+
+class BatchingEmbedding(BaseEmbedding):
+    # Coalesces concurrent async embedding calls made within max_wait_ms into
+    # one batched request to the wrapped model, of at most max_batch_size
+    # texts. Sync calls come from worker threads and go straight through.
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _max_batch_size: int = PrivateAttr()
+    _max_wait: float = PrivateAttr()
+    _queries_as_texts: bool = PrivateAttr()
+    _loop: Optional[asyncio.AbstractEventLoop] = PrivateAttr(default=None)
+    _pending: Dict[str, List[Tuple[str, asyncio.Future]]] = PrivateAttr(default_factory=dict)
+    _timers: Dict[str, asyncio.TimerHandle] = PrivateAttr(default_factory=dict)
+    _tasks: Set[asyncio.Task] = PrivateAttr(default_factory=set)
+    _stats: Dict[str, int] = PrivateAttr(default_factory=dict)
+
+    def __init__(
+        self,
+        inner: BaseEmbedding,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        **kwargs: Any,
+    ):
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            **kwargs,
+        )
+        self._inner = inner
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000
+        # text-embedding-3 models embed queries and documents with the same
+        # engine, so questions can share a batch with any other text
+        query_engine = getattr(inner, "_query_engine", None)
+        self._queries_as_texts = query_engine is not None and query_engine == getattr(
+            inner, "_text_engine", None)
+        self._pending = {}
+        self._timers = {}
+        self._tasks = set()
+        self._stats = {"requests": 0, "texts": 0, "batches": 0}
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "BatchingEmbedding"
+
+    @property
+    def inner(self) -> BaseEmbedding:
+        return self._inner
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+    async def _submit(self, kind: str, texts: List[str]) -> List[Embedding]:
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+        if loop is not self._loop or len(texts) >= self._max_batch_size:
+            # Already a full batch, or a loop this batcher's futures don't belong to
+            return await self._embed(kind, texts)
+        self._stats["requests"] += 1
+        queue = self._pending.setdefault(kind, [])
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            queue.append((text, future))
+            futures.append(future)
+        if len(queue) >= self._max_batch_size:
+            self._flush(kind)
+        elif kind not in self._timers:
+            self._timers[kind] = loop.call_later(self._max_wait, self._flush, kind)
+        return list(await asyncio.gather(*futures))
+
+    def _flush(self, kind: str) -> None:
+        timer = self._timers.pop(kind, None)
+        if timer is not None:
+            timer.cancel()
+        queue = self._pending.pop(kind, [])
+        for start in range(0, len(queue), self._max_batch_size):
+            task = asyncio.ensure_future(
+                self._run(kind, queue[start:start + self._max_batch_size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, kind: str, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        # Waiters that gave up (client disconnects) are skipped, not failed
+        batch = [(text, future) for text, future in batch if not future.done()]
+        if not batch:
+            return
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self._stats["batches"] += 1
+        self._stats["texts"] += len(texts)
+        metrics.inc("embed_batches_total")
+        metrics.inc("embed_batched_texts_total", len(texts))
+        try:
+            embeddings = dict(zip(texts, await self._embed(kind, texts)))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for text, future in batch:
+            if not future.done():
+                future.set_result(embeddings[text])
+
+    async def _embed(self, kind: str, texts: List[str]) -> List[Embedding]:
+        if kind == "text":
+            return await self._inner._aget_text_embeddings(texts)
+        return list(await asyncio.gather(
+            *(self._inner._aget_query_embedding(text) for text in texts)))
+
+    def _query_kind(self) -> str:
+        return "text" if self._queries_as_texts else "query"
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._inner._get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return (await self._submit(self._query_kind(), [query]))[0]
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._inner._get_text_embedding(text)
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._submit("text", [text]))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._inner._get_text_embeddings(texts)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return await self._submit("text", texts)
+
+
+def wrap_with_batcher(
+    embed_model: BaseEmbedding, max_batch_size: int = 64, max_wait_ms: float = 5.0
+) -> BaseEmbedding:
+    if max_wait_ms <= 0 or max_batch_size <= 1:
+        return embed_model
+    return BatchingEmbedding(embed_model, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
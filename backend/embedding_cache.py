@@ -0,0 +1,213 @@
+from array import array
+from blocking import run_blocking
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+Embedding = List[float]
+
+
+class EmbeddingCache:
+    # Content-addressed float32 embedding store on local disk (SQLite),
+    # bounded by entry count with least-recently-used eviction
+
+    def __init__(self, path: str, max_entries: int = 500_000):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        # Kept as a running total so writes never have to count the table
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model: str, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Embedding]:
+        found: Dict[str, Embedding] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, Embedding]) -> None:
+        if not items:
+            return
+        now = time.time()
+        keys = list(items)
+        with self._lock:
+            existing = 0
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                (found,) = self._conn.execute(
+                    f"SELECT COUNT(*) FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchone()
+                existing += found
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items.items()],
+            )
+            self._count += len(keys) - existing
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        overflow = self._count - self.max_entries
+        if overflow > 0:
+            deleted = self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                " SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (overflow,),
+            ).rowcount
+            self._count -= deleted
+            self.evictions += deleted
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class CachedEmbedding(BaseEmbedding):
+    # Wraps another embed model so each (model, text) pair is embedded once
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, cache: EmbeddingCache, **kwargs):
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            **kwargs,
+        )
+        self._inner = inner
+        self._cache = cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
+    @property
+    def inner(self) -> BaseEmbedding:
+        return self._inner
+
+    def _keys(self, kind: str, texts: List[str]) -> List[str]:
+        return [self._cache.make_key(self.model_name, kind, text) for text in texts]
+
+    def _lookup(self, kind: str, texts: List[str]):
+        keys = self._keys(kind, texts)
+        found = self._cache.get_many(keys)
+        missing = [text for key, text in zip(keys, texts) if key not in found]
+        # Embed each distinct missing text once
+        missing = list(dict.fromkeys(missing))
+        return keys, found, missing
+
+    def _store(self, kind: str, found: Dict[str, Embedding], missing: List[str], embeddings) -> None:
+        fresh = dict(zip(self._keys(kind, missing), embeddings))
+        self._cache.put_many(fresh)
+        found.update(fresh)
+
+    def _embed_sync(self, kind: str, texts: List[str], embed: Callable) -> List[Embedding]:
+        keys, found, missing = self._lookup(kind, texts)
+        if missing:
+            self._store(kind, found, missing, embed(missing))
+        return [found[key] for key in keys]
+
+    async def _embed_async(
+        self,
+        kind: str,
+        texts: List[str],
+        embed: Callable[[List[str]], Awaitable[List[Embedding]]],
+    ) -> List[Embedding]:
+        # SQLite reads and commits stay off the event loop
+        keys, found, missing = await run_blocking(self._lookup, kind, texts)
+        if missing:
+            embeddings = await embed(missing)
+            await run_blocking(self._store, kind, found, missing, embeddings)
+        return [found[key] for key in keys]
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._embed_sync(
+            "query", [query], lambda texts: [self._inner._get_query_embedding(texts[0])])[0]
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        async def embed(texts: List[str]) -> List[Embedding]:
+            return [await self._inner._aget_query_embedding(texts[0])]
+
+        return (await self._embed_async("query", [query], embed))[0]
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._embed_sync("text", texts, self._inner._get_text_embeddings)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return await self._embed_async("text", texts, self._inner._aget_text_embeddings)
+
+
+# One cache (and SQLite connection) per file, shared by every RAG system
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def wrap_with_cache(
+    embed_model: BaseEmbedding, path: Optional[str], max_entries: int = 500_000
+) -> BaseEmbedding:
+    if not path:
+        return embed_model
+    key = os.path.abspath(path)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = EmbeddingCache(path, max_entries=max_entries)
+    return CachedEmbedding(embed_model, _caches[key])
@@ -0,0 +1,178 @@
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Any, Dict, List, Optional
+import asyncio
+import base64
+import hashlib
+import json
+import numpy as np
+import random
+import re
+import time
+import uuid
+
+EMBEDDING_DIMENSION = 1536
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_VOCABULARY = (
+    "The committee reported the bill favorably with amendments and the Senate approved it on "
+    "second reading after the period of interpellations was closed"
+).split() + [f"term{i}" for i in range(500)]
+
+
+class FaultConfig:
+    # Latency and error injection shared by the fake services
+
+    def __init__(
+        self,
+        embed_latency: float = 0.05,
+        llm_first_token_latency: float = 0.3,
+        llm_token_latency: float = 0.01,
+        response_tokens: int = 200,
+        parse_latency: float = 1.0,
+        parse_pages: int = 20,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.embed_latency = embed_latency
+        self.llm_first_token_latency = llm_first_token_latency
+        self.llm_token_latency = llm_token_latency
+        self.response_tokens = response_tokens
+        self.parse_latency = parse_latency
+        self.parse_pages = parse_pages
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and self._random.random() < self.error_rate
+
+
+def fake_embedding(text: str) -> np.ndarray:
+    # Hashed bag of words: deterministic, and texts sharing words score as
+    # similar, so retrieval over a fake corpus still ranks meaningfully
+    vector = np.zeros(EMBEDDING_DIMENSION, dtype=np.float32)
+    for word in _WORD_PATTERN.findall(text.lower()):
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % EMBEDDING_DIMENSION
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def fake_text(seed: str, words: int) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(_VOCABULARY) for _ in range(words))
+
+
+def _error() -> JSONResponse:
+    return JSONResponse(
+        status_code=500,
+        content={"error": {"message": "Injected failure", "type": "server_error"}},
+    )
+
+
+def create_openai_app(config: FaultConfig) -> FastAPI:
+    # Just enough of the OpenAI embeddings and chat completions API for the
+    # openai client that llama_index uses, including SSE streaming
+    app = FastAPI()
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        await asyncio.sleep(config.embed_latency)
+        if config.should_fail():
+            return _error()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        data = []
+        for i, text in enumerate(inputs):
+            vector = fake_embedding(text if isinstance(text, str) else " ".join(map(str, text)))
+            if body.get("encoding_format") == "base64":
+                embedding: Any = base64.b64encode(vector.astype(np.float32).tobytes()).decode()
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(len(str(text).split()) for text in inputs)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "text-embedding-3-small"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await asyncio.sleep(config.llm_first_token_latency)
+        if config.should_fail():
+            return _error()
+        prompt = " ".join(str(message.get("content", "")) for message in body["messages"])
+        prompt_tokens = len(prompt.split())
+        words = fake_text(prompt, config.response_tokens).split()
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "gpt-4o")
+
+        if not body.get("stream"):
+            await asyncio.sleep(config.llm_token_latency * len(words))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(words),
+                    "total_tokens": prompt_tokens + len(words),
+                },
+            }
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(config.llm_token_latency)
+                yield chunk({"content": word if i == 0 else f" {word}"})
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+class FakeParsedPage:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeParser:
+    # Stands in for LlamaParse: waits parse_latency, then returns parse_pages
+    # pages of text derived from the file's bytes
+
+    def __init__(self, config: FaultConfig):
+        self.config = config
+
+    async def aload_data(self, path: str) -> List[FakeParsedPage]:
+        await asyncio.sleep(self.config.parse_latency)
+        if self.config.should_fail():
+            raise RuntimeError("Injected parse failure")
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        return [
+            FakeParsedPage(f"Page {page}. " + fake_text(f"{digest}:{page}", 300))
+            for page in range(1, self.config.parse_pages + 1)
+        ]
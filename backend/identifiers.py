@@ -0,0 +1,48 @@
+from typing import List
+import re
+
+# "Senate Bill No. 2654", "SB 2654", "S.B. No. 2654" and "SBN-2654" all
+# become the single token "sb2654"; likewise for the other document types.
+# Bare "hr", "sr" and "ra" are also ordinary words ("1 hr 30 min"), so
+# undotted they must be upper case or followed by "No."/"Nos.".
+_MARKER = r"(?=\s*(?:nos?\b|numbers?\b|#))"
+_IDENTIFIER_PREFIXES = [
+    (r"senate\s+bill|s\.?\s*b\.?\s*n?|sbn", "sb"),
+    (r"house\s+bill|h\.?\s*b\.?\s*n?|hbn", "hb"),
+    (r"(?:proposed\s+)?senate\s+resolution|p\.?\s*s\.?\s*res\.?|psrn?|s\.\s*r\.?\s*n?"
+     r"|(?-i:SRN?)|srn?" + _MARKER, "sr"),
+    (r"house\s+resolution|h\.\s*r\.?\s*n?|(?-i:HRN?)|hrn?" + _MARKER, "hr"),
+    (r"republic\s+act|r\.\s*a\.?|(?-i:RA)|ra" + _MARKER, "ra"),
+]
+# "Senate Bill Nos. 2654, 2655 and 2656" names three bills
+_NUMBER_LIST = r"\d+(?:\s*(?:,\s*(?:and\s+|&\s*)?|and\s+|&\s*)\d+)*"
+_IDENTIFIER_PATTERN = re.compile(
+    r"\b(?:" + "|".join(f"(?P<p{i}>{pattern})" for i, (pattern, _) in enumerate(_IDENTIFIER_PREFIXES))
+    + r")\s*(?:(?:nos\.?|numbers)\s*(?P<numbers>" + _NUMBER_LIST + r")"
+    + r"|(?:no\.?|number|#)?\s*-?\s*(?P<number>\d+))\b",
+    re.IGNORECASE,
+)
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was "
+    "were what when where which who will with about does did how".split()
+)
+
+
+def extract_identifiers(text: str) -> List[str]:
+    identifiers = []
+    for match in _IDENTIFIER_PATTERN.finditer(text):
+        for i, (_, canonical) in enumerate(_IDENTIFIER_PREFIXES):
+            if match.group(f"p{i}"):
+                numbers = match.group("numbers")
+                for number in re.findall(r"\d+", numbers) if numbers else [match.group("number")]:
+                    identifiers.append(f"{canonical}{int(number)}")
+                break
+    return identifiers
+
+
+def tokenize(text: str) -> List[str]:
+    identifiers = extract_identifiers(text)
+    remainder = _IDENTIFIER_PATTERN.sub(" ", text).lower()
+    words = [w for w in _WORD_PATTERN.findall(remainder) if w not in _STOPWORDS]
+    return identifiers + words
@@ -0,0 +1,229 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+from llama_index.core import Document
+from llama_index.core.node_parser import MarkdownElementNodeParser, SentenceSplitter
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.llms.openai import OpenAI
+
+from bill_timeline import BillTimelineStore
+from blocking import run_blocking
+from document_metadata import extract_metadata, hidden_keys
+from ingestion import parse_pdf
+from rag import LlamaIndexRAG
+
+load_dotenv()
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {"files": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path: str, manifest: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    manifest["updated_at"] = time.time()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def find_pdfs(directory: str) -> List[str]:
+    paths = []
+    for root, _, names in os.walk(directory):
+        paths.extend(os.path.join(root, name) for name in names if name.lower().endswith(".pdf"))
+    return sorted(paths)
+
+
+class CorpusIngester:
+    # Incremental directory -> vector store ingestion: only files whose content
+    # hash differs from the manifest are parsed, embedded and upserted
+
+    def __init__(self, rag: LlamaIndexRAG, args: argparse.Namespace):
+        self.rag = rag
+        self.args = args
+        self.manifest = load_manifest(args.manifest)
+        self.timelines = BillTimelineStore(args.timeline_db)
+        self.parse_semaphore = asyncio.Semaphore(args.parse_workers)
+        self.embed_semaphore = asyncio.Semaphore(args.embed_workers)
+        self.write_semaphore = asyncio.Semaphore(args.writers)
+        self.manifest_lock = asyncio.Lock()
+        if args.node_parser == "markdown-element":
+            # Same parser the original notebook ingestion used
+            self.node_parser = MarkdownElementNodeParser(
+                llm=OpenAI(model="gpt-4o-mini"), num_workers=8)
+        else:
+            self.node_parser = SentenceSplitter(chunk_size=512, chunk_overlap=50)
+
+    def build_nodes(self, document: Document) -> List[BaseNode]:
+        nodes = self.node_parser.get_nodes_from_documents([document])
+        if isinstance(self.node_parser, MarkdownElementNodeParser):
+            base_nodes, objects = self.node_parser.get_nodes_and_objects(nodes)
+            nodes = base_nodes + objects
+        return nodes
+
+    async def embed(self, nodes: List[BaseNode]) -> None:
+        embed_model = self.rag.embed_model
+        size = self.args.embed_batch_size
+
+        async def embed_batch(batch: List[BaseNode]) -> None:
+            texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in batch]
+            async with self.embed_semaphore:
+                embeddings = await embed_model.aget_text_embedding_batch(texts)
+            for node, embedding in zip(batch, embeddings):
+                node.embedding = embedding
+
+        await asyncio.gather(*(
+            embed_batch(nodes[start:start + size]) for start in range(0, len(nodes), size)
+        ))
+
+    async def write(self, nodes: List[BaseNode]) -> None:
+        size = self.args.write_batch_size
+
+        async def write_batch(batch: List[BaseNode]) -> None:
+            async with self.write_semaphore:
+                await run_blocking(self.rag.vector_store.add, batch)
+
+        await asyncio.gather(*(
+            write_batch(nodes[start:start + size]) for start in range(0, len(nodes), size)
+        ))
+
+    async def ingest_file(self, path: str, relative_path: str, sha256: str) -> int:
+        async with self.parse_semaphore:
+            pages = await parse_pdf(path)
+        title = os.path.splitext(os.path.basename(path))[0]
+        # The relative path is the ref_doc_id and the file_name every node
+        # inherits, so a changed file's old nodes can be found and deleted
+        metadata = {**extract_metadata(title, pages), "file_name": relative_path}
+        document = Document(
+            id_=relative_path,
+            text="\n\n".join(pages),
+            metadata=metadata,
+            excluded_embed_metadata_keys=hidden_keys(metadata, embed=True),
+            excluded_llm_metadata_keys=hidden_keys(metadata),
+        )
+        nodes = await run_blocking(self.build_nodes, document)
+        await run_blocking(self.timelines.add_document, relative_path, title, pages)
+        await self.embed(nodes)
+        # Node IDs are random, so delete unconditionally: a file missing from
+        # the manifest may still have chunks from an interrupted earlier run.
+        # By file_name rather than ref_doc_id: table nodes from the markdown
+        # parser inherit the file's metadata but have no source document.
+        await run_blocking(self.rag.vector_store.delete_where, "file_name", relative_path)
+        self.rag.lexical_index.remove_where("file_name", relative_path)
+        await self.write(nodes)
+        self.rag.add_to_lexical_index(nodes, persist=False)
+        async with self.manifest_lock:
+            self.manifest["files"][relative_path] = {
+                "sha256": sha256,
+                "nodes": len(nodes),
+                "ingested_at": time.time(),
+            }
+            # Saved per file so an interrupted run resumes where it stopped. The
+            # lexical index goes first: the manifest must never list a file
+            # whose chunks the persisted BM25 index lacks.
+            if self.rag.lexical_index_path:
+                await run_blocking(self.rag.lexical_index.save, self.rag.lexical_index_path)
+            await run_blocking(save_manifest, self.args.manifest, self.manifest)
+        return len(nodes)
+
+    async def run(self) -> Dict[str, Any]:
+        started = time.monotonic()
+        pending = []
+        skipped = 0
+        for path in find_pdfs(self.args.directory):
+            relative_path = os.path.relpath(path, self.args.directory)
+            sha256 = await run_blocking(file_sha256, path)
+            entry = self.manifest["files"].get(relative_path)
+            if entry is not None and entry["sha256"] == sha256 and not self.args.force:
+                skipped += 1
+                continue
+            pending.append((path, relative_path, sha256))
+
+        print(f"{len(pending)} new or changed PDFs, {skipped} unchanged")
+        if self.args.dry_run:
+            for _, relative_path, _ in pending:
+                print(f"  would ingest {relative_path}")
+            return {"changed": len(pending), "skipped": skipped}
+
+        async def ingest(item):
+            path, relative_path, sha256 = item
+            try:
+                count = await self.ingest_file(path, relative_path, sha256)
+                print(f"  ingested {relative_path}: {count} nodes")
+                return count
+            except Exception as e:
+                print(f"  failed {relative_path}: {e}")
+                return None
+
+        results = await asyncio.gather(*(ingest(item) for item in pending))
+        return {
+            "changed": len(pending),
+            "skipped": skipped,
+            "failed": sum(1 for r in results if r is None),
+            "nodes": sum(r for r in results if r),
+            "seconds": round(time.monotonic() - started, 2),
+        }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Incrementally ingest a directory of PDFs into the 'general' vector store.")
+    parser.add_argument("directory", help="Directory to scan for PDFs (recursively).")
+    parser.add_argument("--manifest", default=os.getenv(
+        "GENERAL_INGEST_MANIFEST", ".cache/general_manifest.json"))
+    parser.add_argument("--timeline-db", default=os.getenv(
+        "BILL_TIMELINE_PATH", ".cache/bill_timelines.sqlite3"))
+    parser.add_argument("--node-parser", choices=["markdown-element", "sentence"],
+                        default="markdown-element")
+    parser.add_argument("--parse-workers", type=int, default=4)
+    parser.add_argument("--embed-batch-size", type=int, default=100)
+    parser.add_argument("--embed-workers", type=int, default=4)
+    parser.add_argument("--write-batch-size", type=int, default=50)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--force", action="store_true",
+                        help="Re-ingest files even if their hash is unchanged.")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Only report which files would be ingested.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    rag = LlamaIndexRAG(
+        system_type="general",
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        astra_token=os.getenv("ASTRA_DB_APPLICATION_TOKEN"),
+        astra_db_id=os.getenv("ASTRA_DB_ID"),
+        astra_db_region=os.getenv("ASTRA_DB_REGION"),
+        astra_keyspace=os.getenv("ASTRA_DB_KEYSPACE"),
+        collection_name=os.getenv("ASTRA_DB_COLLECTION"),
+        embedding_cache_path=os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3"),
+        vector_store_backend=os.getenv("GENERAL_VECTOR_STORE", "astra"),
+        local_store_path=os.getenv("GENERAL_LOCAL_STORE_PATH", ".cache/general_index"),
+        lexical_index_path=os.getenv("GENERAL_LEXICAL_INDEX_PATH", ".cache/general_lexical.jsonl"),
+        corpus_manifest_path=args.manifest,
+    )
+    summary = asyncio.run(CorpusIngester(rag, args).run())
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
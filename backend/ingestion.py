@@ -0,0 +1,124 @@
+from blocking import run_blocking
+from contextlib import asynccontextmanager
+from documents import DocumentStore
+from jobs import JobContext, ProgressCallback
+from telemetry import timed
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import os
+import tempfile
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload exceeds the {max_bytes} byte limit.")
+        self.max_bytes = max_bytes
+
+
+_parser = None
+
+
+def get_parser():
+    # One client for the whole process instead of one per upload, imported
+    # on first use so the app can start serving before the parser loads
+    global _parser
+    if _parser is None:
+        from llama_parse import LlamaParse
+        _parser = LlamaParse(result_type="markdown")
+    return _parser
+
+
+@asynccontextmanager
+async def spool_upload(
+    upload,
+    max_bytes: int,
+    directory: Optional[str] = None,
+    suffix: str = ".pdf",
+) -> AsyncIterator[str]:
+    # Copies an UploadFile to disk in fixed-size chunks, enforcing the size
+    # cap as it goes, and always removes the temp file afterwards
+    path = await save_upload(upload, max_bytes, directory=directory, suffix=suffix)
+    try:
+        yield path
+    finally:
+        _remove(path)
+
+
+async def save_upload(
+    upload,
+    max_bytes: int,
+    directory: Optional[str] = None,
+    suffix: str = ".pdf",
+) -> str:
+    # Like spool_upload, but the caller owns the file once this returns
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            written = 0
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                await run_blocking(f.write, chunk)
+    except BaseException:
+        _remove(path)
+        raise
+    return path
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def parse_pdf(path: str) -> List[str]:
+    # LlamaParse splits by page, so each entry is one page of markdown
+    with timed("parse"):
+        documents = await get_parser().aload_data(path)
+    return [doc.text for doc in documents]
+
+
+IndexBuilder = Callable[[List[str], str, ProgressCallback], Awaitable[str]]
+
+
+def make_ingestion_runner(documents: DocumentStore, build_index: IndexBuilder):
+    # parse -> split -> embed -> index for one spooled PDF; split and embed
+    # interleave page by page, so their timings overlap
+    async def run(ctx: JobContext) -> Dict[str, Any]:
+        path = ctx.job.params["path"]
+        finished = False
+        try:
+            ctx.start_stage("parse", total=1)
+            content = await parse_pdf(path)
+            ctx.finish_stage("parse")
+
+            document_id = await run_blocking(
+                documents.save, content, filename=ctx.job.params.get("filename"))
+            ctx.start_stage("split", total=len(content))
+            ctx.start_stage("embed")
+            ctx.start_stage("index", total=1)
+            await build_index(content, document_id, ctx.progress)
+            ctx.finish_stage("split")
+            ctx.finish_stage("embed")
+            ctx.finish_stage("index")
+            finished = True
+            return {"document_id": document_id, "pages": len(content)}
+        except asyncio.CancelledError:
+            # Keep the upload if the server is shutting down so the job can resume
+            finished = ctx.cancelled
+            raise
+        except Exception:
+            finished = True
+            raise
+        finally:
+            if finished:
+                _remove(path)
+
+    return run
@@ -0,0 +1,368 @@
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from blocking import run_blocking
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+# Worker lane for job kinds registered without a concurrency of their own
+DEFAULT_LANE = "default"
+
+# (stage, done, total) reports from long-running index builds
+ProgressCallback = Callable[[str, int, Optional[int]], None]
+
+
+class JobCancelledError(Exception):
+    pass
+
+
+class ProgressBroadcast:
+    # Fans one progress stream (a shared index build) out to every job
+    # following it. Late listeners first get the latest report per stage, and
+    # a listener that raises (its job was cancelled) is detached instead of
+    # failing the work everyone else is waiting on.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners: List[ProgressCallback] = []
+        self._latest: Dict[str, Tuple[int, Optional[int]]] = {}
+
+    def attach(self, listener: ProgressCallback) -> None:
+        with self._lock:
+            self._listeners.append(listener)
+            latest = list(self._latest.items())
+        for stage, (done, total) in latest:
+            if not self._deliver(listener, stage, done, total):
+                return
+
+    def detach(self, listener: ProgressCallback) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def __call__(self, stage: str, done: int, total: Optional[int] = None) -> None:
+        with self._lock:
+            self._latest[stage] = (done, total)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            self._deliver(listener, stage, done, total)
+
+    def _deliver(self, listener: ProgressCallback, stage: str, done: int, total: Optional[int]) -> bool:
+        try:
+            listener(stage, done, total)
+            return True
+        except Exception:
+            self.detach(listener)
+            return False
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    params: Dict[str, Any]
+    status: str = QUEUED
+    stages: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class JobContext:
+    # Handed to job runners to report per-stage progress; safe to call from
+    # worker threads, and raises once the job has been cancelled
+
+    def __init__(self, manager: "JobManager", job: Job):
+        self._manager = manager
+        self.job = job
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check_cancelled(self) -> None:
+        if self._cancelled.is_set():
+            raise JobCancelledError(self.job.id)
+
+    def start_stage(self, name: str, total: Optional[int] = None) -> None:
+        self.check_cancelled()
+        with self._manager._lock:
+            stage = self.job.stages.setdefault(
+                name, {"done": 0, "total": total, "elapsed": 0.0, "finished": False})
+            stage["total"] = total
+            stage["_started"] = time.monotonic()
+        self._manager._persist(self.job)
+
+    def progress(self, name: str, done: int, total: Optional[int] = None) -> None:
+        self.check_cancelled()
+        with self._manager._lock:
+            stage = self.job.stages.setdefault(
+                name, {"done": 0, "total": total, "elapsed": 0.0, "finished": False})
+            stage["done"] = done
+            if total is not None:
+                stage["total"] = total
+            self.job.updated_at = time.time()
+
+    def finish_stage(self, name: str) -> None:
+        with self._manager._lock:
+            stage = self.job.stages[name]
+            started = stage.pop("_started", None)
+            if started is not None:
+                stage["elapsed"] += time.monotonic() - started
+            if stage["total"] is not None:
+                stage["done"] = stage["total"]
+            stage["finished"] = True
+        self._manager._persist(self.job)
+
+
+Runner = Callable[[JobContext], Awaitable[Dict[str, Any]]]
+
+
+class JobManager:
+    # Bounded pools of asyncio workers over a SQLite-persisted job table;
+    # unfinished jobs are re-queued when the manager starts again. Kinds
+    # registered with their own concurrency get their own queue and workers,
+    # so slow jobs of one kind never hold up the others. Writes go through one
+    # background thread that coalesces each job's updates between flushes, and
+    # finished jobs leave memory after a while, served from SQLite after that.
+
+    def __init__(
+        self,
+        path: str,
+        concurrency: int = 2,
+        retention_seconds: float = 7 * 24 * 3600,
+        flush_interval: float = 0.5,
+        max_finished_jobs: int = 1000,
+        finished_ttl_seconds: float = 3600,
+    ):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.concurrency = concurrency
+        self.retention_seconds = retention_seconds
+        self.flush_interval = flush_interval
+        self.max_finished_jobs = max_finished_jobs
+        self.finished_ttl_seconds = finished_ttl_seconds
+        self._runners: Dict[str, Runner] = {}
+        self._jobs: Dict[str, Job] = {}
+        # Finished jobs still in memory, oldest first, with when they finished
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        # Latest serialized state per job, waiting for the writer thread
+        self._pending: Dict[str, Tuple[str, float]] = {}
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._contexts: Dict[str, JobContext] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._lock = threading.RLock()
+        self._lanes: Dict[str, int] = {DEFAULT_LANE: concurrency}
+        self._kind_lanes: Dict[str, str] = {}
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: List[asyncio.Task] = []
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        threading.Thread(target=self._writer, name="job-writer", daemon=True).start()
+
+    def register(self, kind: str, runner: Runner, concurrency: Optional[int] = None) -> None:
+        self._runners[kind] = runner
+        if concurrency is not None:
+            self._lanes[kind] = concurrency
+            self._kind_lanes[kind] = kind
+
+    def _queue_for(self, kind: str) -> asyncio.Queue:
+        return self._queues[self._kind_lanes.get(kind, DEFAULT_LANE)]
+
+    async def start(self) -> None:
+        self._queues = {lane: asyncio.Queue() for lane in self._lanes}
+        rows = await run_blocking(self._load_unfinished)
+        for (data,) in rows:
+            job = Job(**json.loads(data))
+            # Interrupted by a restart: start over from the first stage
+            job.status = QUEUED
+            job.stages = {}
+            with self._lock:
+                self._jobs[job.id] = job
+            self._persist(job)
+            self._queue_for(job.kind).put_nowait(job.id)
+        self._workers = [
+            asyncio.create_task(self._worker(self._queues[lane]))
+            for lane, concurrency in self._lanes.items()
+            for _ in range(concurrency)
+        ]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await run_blocking(self.flush)
+
+    def _load_unfinished(self) -> List[Tuple[str]]:
+        with self._write_lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE updated_at < ?",
+                (time.time() - self.retention_seconds,))
+            self._conn.commit()
+            # Finished jobs stay on disk and are read back on demand
+            rows = self._conn.execute("SELECT data FROM jobs ORDER BY updated_at").fetchall()
+        return [(data,) for (data,) in rows if json.loads(data)["status"] not in FINISHED_STATES]
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> Job:
+        if kind not in self._runners:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = Job(id=uuid.uuid4().hex, kind=kind, params=params)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._persist(job)
+        self._queue_for(kind).put_nowait(job.id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        # Reads SQLite for jobs no longer in memory; call off the event loop
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                data = self._public_dict(job)
+                data["queued"] = self._queue_for(job.kind).qsize() if self._queues else 0
+                return data
+            pending = self._pending.get(job_id)
+        if pending is not None:
+            stored = pending[0]
+        else:
+            # A flush that took it and has not committed yet holds the lock
+            with self._write_lock:
+                row = self._conn.execute(
+                    "SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            stored = row[0]
+        return {**json.loads(stored), "queued": 0}
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return False
+            job.status = CANCELLED
+            context = self._contexts.get(job_id)
+            if context is not None:
+                # Stops blocking stages at their next progress report
+                context._cancelled.set()
+            task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+        self._persist(job)
+        if task is None:
+            # Still queued; a running job is marked finished by its worker
+            self._mark_finished(job)
+        return True
+
+    @staticmethod
+    def _public_dict(job: Job) -> Dict[str, Any]:
+        # Drops in-flight bookkeeping such as stage start times
+        data = job.to_dict()
+        data["stages"] = {
+            name: {k: v for k, v in stage.items() if not k.startswith("_")}
+            for name, stage in job.stages.items()
+        }
+        return data
+
+    def _persist(self, job: Job) -> None:
+        # Only snapshots the job; the writer thread does the I/O
+        with self._lock:
+            job.updated_at = time.time()
+            self._pending[job.id] = (json.dumps(self._public_dict(job)), job.updated_at)
+        self._wake.set()
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO jobs (id, data, updated_at) VALUES (?, ?, ?)",
+                [(job_id, data, updated_at) for job_id, (data, updated_at) in pending.items()],
+            )
+            self._conn.commit()
+
+    def _writer(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            self.flush()
+            # Progress reports in the meantime collapse into the next write
+            time.sleep(self.flush_interval)
+
+    def _mark_finished(self, job: Job) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._finished[job.id] = now
+            while self._finished:
+                job_id, finished_at = next(iter(self._finished.items()))
+                if (len(self._finished) <= self.max_finished_jobs
+                        and now - finished_at <= self.finished_ttl_seconds):
+                    break
+                del self._finished[job_id]
+                self._jobs.pop(job_id, None)
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            job_id = await queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            # Cancelled while queued, and possibly evicted since
+            if job is None or job.status != QUEUED:
+                return
+            job.status = RUNNING
+            context = JobContext(self, job)
+            self._contexts[job_id] = context
+            task = asyncio.create_task(self._runners[job.kind](context))
+            self._tasks[job_id] = task
+        self._persist(job)
+        try:
+            job.result = await task
+            job.status = SUCCEEDED
+        except JobCancelledError:
+            job.status = CANCELLED
+        except asyncio.CancelledError:
+            if not context.cancelled:
+                # Shutting down: leave it running so the next start re-queues it
+                raise
+            job.status = CANCELLED
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            with self._lock:
+                self._contexts.pop(job_id, None)
+                self._tasks.pop(job_id, None)
+            self._persist(job)
+            if job.status in FINISHED_STATES:
+                self._mark_finished(job)
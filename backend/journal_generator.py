@@ -0,0 +1,217 @@
+from blocking import run_blocking
+from llama_index.core.llms import LLM, ChatMessage, ChatResponse, MessageRole
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import Document
+from typing import Any, Callable, List, Optional, Tuple
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+
+JOURNAL_SECTIONS = [
+    "Session Details",
+    "Opening Formalities",
+    "Roll Call and Quorum",
+    "Special Mentions",
+    "Manifestations",
+    "Legislative Proceedings",
+    "Sponsorship and Cosponsorship Speeches",
+    "Interpellations",
+    "Committee Reports",
+    "Other Proceedings",
+    "Adjournment",
+]
+
+MAP_PROMPT = """
+    Below is part {part} of {total} of a transcript of a session of the Senate of the Philippines.
+    Extract everything in it that belongs in the session journal, under these sections:
+    {sections}
+
+    Write one "## <Section>" heading per section, followed by detailed notes: names of senators,
+    times, bill and resolution numbers, motions and their outcomes. Leave out sections that this
+    part of the transcript does not cover. Only use information from the transcript.
+
+    Transcript:
+    {text}
+"""
+
+REDUCE_PROMPT = """
+    The notes below were extracted, in order, from consecutive parts of the same Senate session
+    transcript. Merge them into a single set of notes under the same "## <Section>" headings, in
+    this order:
+    {sections}
+
+    Keep every distinct fact, senator, time, bill or resolution number and motion. Remove only
+    exact repetitions, and keep events in chronological order within each section.
+
+    {notes}
+"""
+
+FINAL_PROMPT = """
+    Write the journal of this Senate session from the notes below, which were extracted from
+    the complete transcript.
+
+    {notes}
+"""
+
+
+def _field(value: Any, name: str) -> Any:
+    # OpenAI responses are objects, but may have been serialized to dicts
+    return value.get(name) if isinstance(value, dict) else getattr(value, name, None)
+
+
+def finish_reason(response: ChatResponse) -> Optional[str]:
+    choices = _field(response.raw, "choices")
+    return _field(choices[0], "finish_reason") if choices else None
+
+
+class SegmentCache:
+    # Results of LLM calls keyed by a hash of the model and prompts,
+    # so re-running generation on the same transcript reuses finished work
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, text TEXT NOT NULL)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM results WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, text) VALUES (?, ?)", (key, text))
+            self._conn.commit()
+
+
+class JournalGenerator:
+    # Map-reduce over a transcript: extract journal sections from each segment
+    # concurrently, merge the notes hierarchically, then write the journal
+
+    def __init__(
+        self,
+        llm: LLM,
+        final_llm: LLM,
+        text_splitter: SentenceSplitter,
+        reduce_llm: Optional[LLM] = None,
+        chunks_per_segment: int = 8,
+        reduce_fanout: int = 4,
+        concurrency: int = 8,
+        cache: Optional[SegmentCache] = None,
+    ):
+        self.llm = llm
+        self.final_llm = final_llm
+        self.reduce_llm = reduce_llm or llm
+        self.text_splitter = text_splitter
+        self.chunks_per_segment = chunks_per_segment
+        self.reduce_fanout = reduce_fanout
+        self.concurrency = concurrency
+        self.cache = cache
+        self._sections = "\n    ".join(f"- {section}" for section in JOURNAL_SECTIONS)
+
+    def segments(self, pages: List[str]) -> List[str]:
+        # Consecutive SentenceSplitter chunks, the same ones the journal index embeds
+        nodes = self.text_splitter.get_nodes_from_documents(
+            [Document(text=page) for page in pages])
+        texts = [node.get_content() for node in nodes]
+        return [
+            "\n".join(texts[start:start + self.chunks_per_segment])
+            for start in range(0, len(texts), self.chunks_per_segment)
+        ]
+
+    async def _complete(
+        self, llm: LLM, prompt: str, semaphore: asyncio.Semaphore
+    ) -> Tuple[str, bool]:
+        # The reply, and whether it was cut off at the LLM's max_tokens.
+        # Chat rather than complete: only chat-style calls carry the LLM's
+        # system prompt, which holds the journal format for the final write-up
+        system_prompt = llm.system_prompt
+        key = None
+        if self.cache is not None:
+            model = getattr(llm, "model", llm.class_name())
+            material = f"{model}\0{prompt}"
+            if system_prompt:
+                material = f"{model}\0{system_prompt}\0{prompt}"
+            key = hashlib.sha256(material.encode("utf-8")).hexdigest()
+            cached = await run_blocking(self.cache.get, key)
+            if cached is not None:
+                return cached, False
+        messages = [ChatMessage(role=MessageRole.USER, content=prompt)]
+        if system_prompt:
+            messages.insert(0, ChatMessage(role=MessageRole.SYSTEM, content=system_prompt))
+        async with semaphore:
+            response = await llm.achat(messages)
+        text = (response.message.content or "").strip()
+        truncated = finish_reason(response) == "length"
+        # Cut-off replies are not cached, so a rerun can still tell
+        if key is not None and not truncated:
+            await run_blocking(self.cache.put, key, text)
+        return text, truncated
+
+    async def _merge(self, group: List[str], semaphore: asyncio.Semaphore) -> str:
+        if len(group) == 1:
+            return group[0]
+        merged, truncated = await self._complete(
+            self.reduce_llm,
+            REDUCE_PROMPT.format(sections=self._sections, notes="\n\n".join(group)),
+            semaphore,
+        )
+        if not truncated:
+            return merged
+        # The merge did not fit in the reply: merge each half on its own and
+        # keep both, rather than lose the end of the session
+        middle = len(group) // 2
+        halves = await asyncio.gather(
+            self._merge(group[:middle], semaphore), self._merge(group[middle:], semaphore))
+        return "\n\n".join(halves)
+
+    async def agenerate(
+        self,
+        pages: List[str],
+        progress: Optional[Callable[[str, int, Optional[int]], None]] = None,
+    ) -> str:
+        report = progress or (lambda stage, done, total: None)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # Splitting a multi-hour transcript is real CPU work
+        segments = await run_blocking(self.segments, pages)
+        if not segments:
+            return ""
+
+        done = 0
+
+        async def extract(part: int, text: str) -> str:
+            nonlocal done
+            notes, _ = await self._complete(
+                self.llm,
+                MAP_PROMPT.format(
+                    part=part, total=len(segments), sections=self._sections, text=text),
+                semaphore,
+            )
+            done += 1
+            report("map", done, len(segments))
+            return notes
+
+        notes = await asyncio.gather(
+            *(extract(part, text) for part, text in enumerate(segments, start=1)))
+
+        # Merge groups of neighbouring notes until one set covers the session
+        level = 0
+        while len(notes) > 1:
+            level += 1
+            groups = [
+                notes[start:start + self.reduce_fanout]
+                for start in range(0, len(notes), self.reduce_fanout)
+            ]
+            notes = await asyncio.gather(*(self._merge(group, semaphore) for group in groups))
+            report("reduce", level, None)
+
+        journal, _ = await self._complete(
+            self.final_llm, FINAL_PROMPT.format(notes=notes[0]), semaphore)
+        report("final", 1, 1)
+        return journal
@@ -0,0 +1,128 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import hashlib
+import os
+import threading
+import time
+
+
+def local_index_dir(root: str, index_id: str) -> str:
+    # Index IDs come from clients, so never use them as path components
+    return os.path.join(root, hashlib.sha256(index_id.encode("utf-8")).hexdigest()[:32])
+
+
+@dataclass
+class _Entry:
+    index: Any
+    node_count: int
+    size_bytes: int
+    created_at: float = field(default_factory=time.monotonic)
+    last_access: float = field(default_factory=time.monotonic)
+
+
+class JournalIndexStore:
+    # LRU/TTL cache of per-document journal indexes, bounded by entry count,
+    # total embedded nodes and estimated resident bytes
+
+    def __init__(
+        self,
+        max_indexes: int = 32,
+        max_nodes: Optional[int] = 200_000,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = 3600,
+    ):
+        self.max_indexes = max_indexes
+        self.max_nodes = max_nodes
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._resident_nodes = 0
+        self._resident_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = {"lru": 0, "ttl": 0, "explicit": 0}
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry, time.monotonic())
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                self._remove(key, "ttl")
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            entry.last_access = now
+            self._entries.move_to_end(key)
+            return entry.index
+
+    def put(self, key: str, index: Any, node_count: int, size_bytes: int) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key, None)
+            self._entries[key] = _Entry(index, node_count, size_bytes)
+            self._resident_nodes += node_count
+            self._resident_bytes += size_bytes
+            self._evict(protect=key)
+
+    def discard(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key, "explicit")
+            return True
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._entries.keys())
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": dict(self._evictions),
+                "indexes": len(self._entries),
+                "resident_nodes": self._resident_nodes,
+                "resident_bytes": self._resident_bytes,
+                "max_indexes": self.max_indexes,
+                "max_nodes": self.max_nodes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return self.ttl_seconds is not None and now - entry.last_access > self.ttl_seconds
+
+    def _over_capacity(self) -> bool:
+        return (
+            len(self._entries) > self.max_indexes
+            or (self.max_nodes is not None and self._resident_nodes > self.max_nodes)
+            or (self.max_bytes is not None and self._resident_bytes > self.max_bytes)
+        )
+
+    def _evict(self, protect: Optional[str] = None) -> None:
+        now = time.monotonic()
+        for key in [k for k, e in self._entries.items() if self._expired(e, now)]:
+            self._remove(key, "ttl")
+        # Oldest first; the entry just inserted stays even if it alone exceeds the cap
+        while self._over_capacity():
+            victim = next((k for k in self._entries if k != protect), None)
+            if victim is None:
+                break
+            self._remove(victim, "lru")
+
+    def _remove(self, key: str, reason: Optional[str]) -> None:
+        entry = self._entries.pop(key)
+        self._resident_nodes -= entry.node_count
+        self._resident_bytes -= entry.size_bytes
+        if reason is not None:
+            self._evictions[reason] += 1
@@ -0,0 +1,251 @@
+from blocking import run_blocking
+from collections import Counter, defaultdict
+from document_metadata import hidden_keys
+from identifiers import extract_identifiers, tokenize
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import (
+    BaseNode,
+    NodeRelationship,
+    NodeWithScore,
+    QueryBundle,
+    RelatedNodeInfo,
+    TextNode,
+)
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import json
+import math
+import os
+import threading
+
+# Node fields persisted alongside the text, so BM25 hits come back with the
+# same prompt exclusions and document spans as the vector store's copies
+NODE_FIELDS = (
+    "ref_doc_id",
+    "start_char_idx",
+    "end_char_idx",
+    "excluded_embed_metadata_keys",
+    "excluded_llm_metadata_keys",
+)
+
+
+def node_fields(node: BaseNode) -> Dict[str, Any]:
+    return {
+        "ref_doc_id": node.ref_doc_id,
+        "start_char_idx": getattr(node, "start_char_idx", None),
+        "end_char_idx": getattr(node, "end_char_idx", None),
+        "excluded_embed_metadata_keys": list(node.excluded_embed_metadata_keys),
+        "excluded_llm_metadata_keys": list(node.excluded_llm_metadata_keys),
+    }
+
+
+class LexicalIndex:
+    # In-memory BM25 inverted index over node text; only the nodes are
+    # persisted, postings are rebuilt on load. Removed nodes leave a None
+    # tombstone so the positions of the others stay valid.
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._nodes: List[Optional[Dict[str, Any]]] = []
+        self._ids: Dict[str, int] = {}
+        self._lengths: List[int] = []
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(
+        self,
+        node_id: str,
+        text: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        fields: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        with self._lock:
+            if node_id in self._ids:
+                return
+            doc = len(self._nodes)
+            self._ids[node_id] = doc
+            self._nodes.append(
+                {"id": node_id, "text": text, "metadata": metadata or {}, **(fields or {})})
+            counts = Counter(tokenize(text))
+            for token, tf in counts.items():
+                self._postings[token][doc] = tf
+            length = sum(counts.values())
+            self._lengths.append(length)
+            self._total_length += length
+
+    def remove_where(self, key: str, value: Any) -> int:
+        # Only the removed nodes are re-tokenized, to drop their postings
+        with self._lock:
+            docs = [
+                doc for doc in self._ids.values()
+                if self._nodes[doc]["metadata"].get(key) == value
+            ]
+            for doc in docs:
+                record = self._nodes[doc]
+                for token in set(tokenize(record["text"])):
+                    postings = self._postings.get(token)
+                    if postings is not None:
+                        postings.pop(doc, None)
+                        if not postings:
+                            del self._postings[token]
+                self._total_length -= self._lengths[doc]
+                self._lengths[doc] = 0
+                del self._ids[record["id"]]
+                self._nodes[doc] = None
+        return len(docs)
+
+    def add_nodes(self, nodes) -> None:
+        for node in nodes:
+            self.add(node.node_id, node.get_content(), node.metadata, node_fields(node))
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        required: Optional[List[str]] = None,
+        where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> List[Tuple[int, float]]:
+        # Returns (doc, score) pairs; with `required`, only documents that
+        # contain every one of those tokens are considered, and with `where`,
+        # only documents whose metadata it accepts
+        tokens = tokenize(query)
+        with self._lock:
+            n = len(self._ids)
+            if n == 0 or not tokens:
+                return []
+            allowed = None
+            for token in required or []:
+                docs = set(self._postings.get(token, {}))
+                allowed = docs if allowed is None else allowed & docs
+            if where is not None:
+                docs = {
+                    doc for doc in (self._ids.values() if allowed is None else allowed)
+                    if where(self._nodes[doc]["metadata"])
+                }
+                allowed = docs
+            average_length = self._total_length / n
+            scores: Dict[int, float] = defaultdict(float)
+            for token in set(tokens):
+                postings = self._postings.get(token)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc, tf in postings.items():
+                    if allowed is not None and doc not in allowed:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc] / average_length)
+                    scores[doc] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+    def node(self, doc: int) -> TextNode:
+        record = self._nodes[doc]
+        excluded_llm = record.get("excluded_llm_metadata_keys")
+        if excluded_llm is None:
+            # Saved before exclusions were persisted; the ingestion defaults
+            excluded_llm = hidden_keys(record["metadata"])
+        excluded_embed = record.get("excluded_embed_metadata_keys")
+        if excluded_embed is None:
+            excluded_embed = hidden_keys(record["metadata"], embed=True)
+        node = TextNode(
+            id_=record["id"],
+            text=record["text"],
+            metadata=record["metadata"],
+            excluded_embed_metadata_keys=excluded_embed,
+            excluded_llm_metadata_keys=excluded_llm,
+            start_char_idx=record.get("start_char_idx"),
+            end_char_idx=record.get("end_char_idx"),
+        )
+        if record.get("ref_doc_id"):
+            node.relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(
+                node_id=record["ref_doc_id"])
+        return node
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            nodes = [record for record in self._nodes if record is not None]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in nodes:
+                f.write(json.dumps(record) + "\n")
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        index = cls()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    index.add(
+                        record["id"], record["text"], record["metadata"],
+                        {key: record[key] for key in NODE_FIELDS if key in record})
+        return index
+
+
+class HybridRetriever(BaseRetriever):
+    # Fuses BM25 and vector results with reciprocal rank fusion. Queries whose
+    # identifiers alone pin down enough chunks never reach the embed model.
+
+    def __init__(
+        self,
+        vector_retriever: BaseRetriever,
+        lexical_index: LexicalIndex,
+        similarity_top_k: int = 5,
+        candidate_k: Optional[int] = None,
+        rrf_k: int = 60,
+        where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ):
+        super().__init__()
+        self.vector_retriever = vector_retriever
+        self.lexical_index = lexical_index
+        self.similarity_top_k = similarity_top_k
+        self.candidate_k = candidate_k or similarity_top_k * 4
+        self.rrf_k = rrf_k
+        # Metadata predicate for the BM25 side; the vector side is filtered
+        # by the store itself
+        self.where = where
+
+    def _lexical(self, query: str):
+        identifiers = extract_identifiers(query)
+        if identifiers:
+            exact = self.lexical_index.search(
+                query, self.candidate_k, required=identifiers, where=self.where)
+            if len(exact) >= self.similarity_top_k:
+                return exact, True
+        return self.lexical_index.search(query, self.candidate_k, where=self.where), False
+
+    def decisive(self, query: str) -> bool:
+        # Whether this query is answered from BM25 alone, without embedding it
+        return self._lexical(query)[1]
+
+    def _fuse(self, lexical, vector: List[NodeWithScore]) -> List[NodeWithScore]:
+        scores: Dict[str, float] = defaultdict(float)
+        nodes: Dict[str, Any] = {}
+        for rank, (doc, _) in enumerate(lexical):
+            node = self.lexical_index.node(doc)
+            scores[node.node_id] += 1 / (self.rrf_k + rank + 1)
+            nodes[node.node_id] = node
+        for rank, result in enumerate(vector):
+            scores[result.node.node_id] += 1 / (self.rrf_k + rank + 1)
+            # Prefer the vector store's copy, which carries full relationships
+            nodes[result.node.node_id] = result.node
+        ranked = sorted(scores, key=scores.get, reverse=True)[:self.similarity_top_k]
+        return [NodeWithScore(node=nodes[node_id], score=scores[node_id]) for node_id in ranked]
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        lexical, decisive = self._lexical(query_bundle.query_str)
+        if decisive:
+            return self._fuse(lexical, [])
+        return self._fuse(lexical, self.vector_retriever.retrieve(query_bundle))
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        # BM25 scoring and the metadata predicate are CPU work over the corpus
+        lexical, decisive = await run_blocking(self._lexical, query_bundle.query_str)
+        if decisive:
+            return self._fuse(lexical, [])
+        return self._fuse(lexical, await self.vector_retriever.aretrieve(query_bundle))
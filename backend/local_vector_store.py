@@ -0,0 +1,271 @@
+from blocking import run_blocking
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterCondition,
+    FilterOperator,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.simple import SimpleVectorStore
+from llama_index.core.vector_stores.utils import metadata_dict_to_node, node_to_metadata_dict
+from typing import Any, Dict, Iterator, List, Optional
+import json
+import numpy as np
+import os
+import threading
+
+EMBEDDINGS_FILE = "embeddings.f32"
+NODES_FILE = "nodes.jsonl"
+TOMBSTONES_FILE = "deleted.jsonl"
+# Deleted rows are only masked out; the files are rewritten once this
+# fraction of the rows is dead
+COMPACT_FRACTION = 0.25
+
+_OPERATORS = {
+    FilterOperator.EQ: lambda value, target: value == target,
+    FilterOperator.NE: lambda value, target: value != target,
+    FilterOperator.GT: lambda value, target: value is not None and value > target,
+    FilterOperator.GTE: lambda value, target: value is not None and value >= target,
+    FilterOperator.LT: lambda value, target: value is not None and value < target,
+    FilterOperator.LTE: lambda value, target: value is not None and value <= target,
+    FilterOperator.IN: lambda value, target: value in target,
+    FilterOperator.NIN: lambda value, target: value not in target,
+    FilterOperator.CONTAINS: lambda value, target: isinstance(value, list) and target in value,
+}
+
+
+def matches_filters(filters: MetadataFilters, metadata: Dict[str, Any]) -> bool:
+    results = []
+    for item in filters.filters:
+        if isinstance(item, MetadataFilters):
+            results.append(matches_filters(item, metadata))
+            continue
+        compare = _OPERATORS.get(item.operator)
+        if compare is None:
+            raise ValueError(f"Unsupported filter operator: {item.operator}")
+        try:
+            results.append(compare(metadata.get(item.key), item.value))
+        except TypeError:
+            results.append(False)  # Mismatched types never match
+    if filters.condition == FilterCondition.OR:
+        return any(results)
+    return all(results)
+
+
+def read_jsonl(path: str) -> List[Any]:
+    # Records from an append-only JSONL file. A crash mid append leaves a
+    # partial last line: it is dropped and cut off the file, so the next
+    # append does not run on from it.
+    if not os.path.exists(path):
+        return []
+    records = []
+    valid = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            valid += len(line)
+            if line.strip():
+                records.append(json.loads(line))
+    if valid < os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(valid)
+    return records
+
+
+class LocalVectorStore(BasePydanticVectorStore):
+    # On-disk vector store: a contiguous, memory-mapped float32 matrix of
+    # unit-normalized embeddings plus a JSONL sidecar holding each row's node
+    # and metadata. Search is a single matrix-vector product.
+
+    stores_text: bool = True
+    flat_metadata: bool = False
+    persist_dir: str
+    embedding_dimension: int
+
+    _lock: threading.RLock = PrivateAttr()
+    _matrix: Optional[np.ndarray] = PrivateAttr(default=None)
+    _rows: List[Dict[str, Any]] = PrivateAttr(default_factory=list)
+    _live: Optional[np.ndarray] = PrivateAttr(default=None)
+
+    def __init__(self, persist_dir: str, embedding_dimension: int, **kwargs):
+        super().__init__(persist_dir=persist_dir, embedding_dimension=embedding_dimension, **kwargs)
+        os.makedirs(persist_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._rows = []
+        self._load()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalVectorStore"
+
+    @property
+    def client(self) -> None:
+        return None
+
+    def __len__(self) -> int:
+        return int(self._live.sum())
+
+    def __bool__(self) -> bool:
+        # Otherwise an empty store is falsy, and StorageContext.from_defaults
+        # (`if vector_store:`) silently swaps in an in-memory SimpleVectorStore
+        return True
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.persist_dir, name)
+
+    def _load(self) -> None:
+        # Vectors are appended before their rows, so a torn row only leaves
+        # extra trailing vectors, which _remap ignores and add overwrites
+        self._rows = read_jsonl(self._path(NODES_FILE))
+        self._live = np.ones(len(self._rows), dtype=bool)
+        for row, node_id in read_jsonl(self._path(TOMBSTONES_FILE)):
+            # The ID guards against tombstones outliving a compaction
+            if row < len(self._rows) and self._rows[row]["id"] == node_id:
+                self._live[row] = False
+        self._remap()
+
+    def _remap(self) -> None:
+        path = self._path(EMBEDDINGS_FILE)
+        rows = len(self._rows)
+        if rows == 0 or not os.path.exists(path):
+            self._matrix = np.zeros((0, self.embedding_dimension), dtype=np.float32)
+            return
+        # A crash between the two appends can leave extra trailing vectors
+        self._matrix = np.memmap(
+            path, dtype=np.float32, mode="r", shape=(rows, self.embedding_dimension))
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+        vectors = np.asarray([node.get_embedding() for node in nodes], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+        rows = [
+            {
+                "id": node.node_id,
+                "ref_doc_id": node.ref_doc_id,
+                "metadata": node_to_metadata_dict(
+                    node, remove_text=False, flat_metadata=self.flat_metadata),
+            }
+            for node in nodes
+        ]
+        with self._lock:
+            # Drop any vectors beyond the last complete row before appending
+            with open(self._path(EMBEDDINGS_FILE), "ab") as f:
+                f.truncate(len(self._rows) * self.embedding_dimension * 4)
+                f.write(vectors.tobytes())
+            with open(self._path(NODES_FILE), "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(row) + "\n" for row in rows)
+            self._rows.extend(rows)
+            self._live = np.concatenate([self._live, np.ones(len(rows), dtype=bool)])
+            self._remap()
+        return [row["id"] for row in rows]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        with self._lock:
+            self._tombstone([
+                i for i, row in enumerate(self._rows)
+                if self._live[i] and row["ref_doc_id"] == ref_doc_id
+            ])
+
+    def delete_where(self, key: str, value: Any) -> None:
+        # Rows whose node metadata has key == value, whichever document they came from
+        with self._lock:
+            self._tombstone([
+                i for i, row in enumerate(self._rows)
+                if self._live[i] and row["metadata"].get(key) == value
+            ])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rewrite([])
+
+    def _tombstone(self, indices: List[int]) -> None:
+        if not indices:
+            return
+        with open(self._path(TOMBSTONES_FILE), "a", encoding="utf-8") as f:
+            f.writelines(json.dumps([i, self._rows[i]["id"]]) + "\n" for i in indices)
+        live = self._live.copy()
+        live[indices] = False
+        # Replaced, not updated in place: a running query may hold the old mask
+        self._live = live
+        if len(self._rows) - len(self) > COMPACT_FRACTION * len(self._rows):
+            self._rewrite(np.flatnonzero(live).tolist())
+
+    def _rewrite(self, keep: List[int]) -> None:
+        matrix = np.array(self._matrix[keep], dtype=np.float32)
+        rows = [self._rows[i] for i in keep]
+        # Release the old mapping before replacing the file underneath it
+        self._matrix = None
+        for name, write in (
+            (EMBEDDINGS_FILE, lambda f: f.write(matrix.tobytes())),
+            (NODES_FILE, lambda f: f.writelines(json.dumps(row) + "\n" for row in rows)),
+        ):
+            tmp_path = self._path(name + ".tmp")
+            with open(tmp_path, "wb" if name == EMBEDDINGS_FILE else "w") as f:
+                write(f)
+            os.replace(tmp_path, self._path(name))
+        if os.path.exists(self._path(TOMBSTONES_FILE)):
+            os.remove(self._path(TOMBSTONES_FILE))
+        self._rows = rows
+        self._live = np.ones(len(rows), dtype=bool)
+        self._remap()
+
+    def _candidate_mask(self, query: VectorStoreQuery) -> np.ndarray:
+        mask = self._live
+        if query.doc_ids:
+            doc_ids = set(query.doc_ids)
+            mask = mask & np.array([row["ref_doc_id"] in doc_ids for row in self._rows], dtype=bool)
+        if query.node_ids:
+            node_ids = set(query.node_ids)
+            mask = mask & np.array([row["id"] in node_ids for row in self._rows], dtype=bool)
+        if query.filters is not None and query.filters.filters:
+            mask = mask & np.array(
+                [matches_filters(query.filters, row["metadata"]) for row in self._rows], dtype=bool)
+        return mask
+
+    def iter_nodes(self) -> Iterator[BaseNode]:
+        with self._lock:
+            rows = [row for row, live in zip(self._rows, self._live) if live]
+        for row in rows:
+            yield metadata_dict_to_node(row["metadata"])
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        with self._lock:
+            matrix, rows = self._matrix, self._rows
+            mask = self._candidate_mask(query)
+        candidates = int(mask.sum())
+        if candidates == 0 or query.query_embedding is None:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+        q = np.asarray(query.query_embedding, dtype=np.float32)
+        q /= np.linalg.norm(q) or 1.0
+        scores = np.where(mask, matrix @ q, -np.inf)
+        k = min(query.similarity_top_k, candidates)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        top = [i for i in top if np.isfinite(scores[i])]
+        return VectorStoreQueryResult(
+            nodes=[metadata_dict_to_node(rows[i]["metadata"]) for i in top],
+            similarities=[float(scores[i]) for i in top],
+            ids=[rows[i]["id"] for i in top],
+        )
+
+    async def aquery(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        # The scan is CPU work; keep it off the event loop
+        return await run_blocking(self.query, query, **kwargs)
+
+
+class MemoryVectorStore(SimpleVectorStore):
+    # llama_index's in-memory store, whose async query would otherwise run
+    # its pure-Python similarity scan on the event loop
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MemoryVectorStore"
+
+    async def aquery(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        return await run_blocking(self.query, query, **kwargs)
@@ -0,0 +1,87 @@
+from llama_index.core.callbacks import CBEventType, EventPayload
+from llama_index.core.callbacks.base_handler import BaseCallbackHandler
+from telemetry import metrics, record
+from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+
+_EVENT_STAGES = {
+    CBEventType.EMBEDDING: "embed",
+    CBEventType.RETRIEVE: "retrieve",
+    CBEventType.SYNTHESIZE: "synthesize",
+    CBEventType.LLM: "llm",
+    CBEventType.QUERY: "query",
+}
+
+
+def _usage(response: Any) -> Dict[str, int]:
+    raw = getattr(response, "raw", None)
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+    if usage is None:
+        return {}
+    if not isinstance(usage, dict):
+        usage = {key: getattr(usage, key, None) for key in ("prompt_tokens", "completion_tokens")}
+    return {key: value for key, value in usage.items() if isinstance(value, int)}
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    # Replaces LlamaDebugHandler: turns llama_index events into histogram
+    # observations and token counters instead of keeping every event. Only
+    # in-flight start times are held, and those are capped.
+
+    def __init__(self, max_pending: int = 10000):
+        super().__init__(event_starts_to_ignore=[], event_ends_to_ignore=[])
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._starts: Dict[str, Tuple[str, float]] = {}
+
+    def on_event_start(
+        self,
+        event_type: CBEventType,
+        payload: Optional[Dict[str, Any]] = None,
+        event_id: str = "",
+        parent_id: str = "",
+        **kwargs: Any,
+    ) -> str:
+        stage = _EVENT_STAGES.get(event_type)
+        if stage is not None:
+            with self._lock:
+                if len(self._starts) >= self.max_pending:
+                    # Ends that never arrived (abandoned streams); drop the oldest
+                    self._starts.pop(next(iter(self._starts)))
+                self._starts[event_id] = (stage, time.perf_counter())
+        return event_id
+
+    def on_event_end(
+        self,
+        event_type: CBEventType,
+        payload: Optional[Dict[str, Any]] = None,
+        event_id: str = "",
+        **kwargs: Any,
+    ) -> None:
+        with self._lock:
+            started = self._starts.pop(event_id, None)
+        if started is not None:
+            stage, start = started
+            record(stage, time.perf_counter() - start)
+        if not payload:
+            return
+        if event_type == CBEventType.LLM:
+            response = payload.get(EventPayload.RESPONSE) or payload.get(EventPayload.COMPLETION)
+            for kind, count in _usage(response).items():
+                metrics.inc("llm_tokens_total", count, kind=kind.replace("_tokens", ""))
+        elif event_type == CBEventType.EMBEDDING:
+            metrics.inc("embedded_texts_total", len(payload.get(EventPayload.CHUNKS) or []))
+
+    def start_trace(self, trace_id: Optional[str] = None) -> None:
+        pass
+
+    def end_trace(
+        self,
+        trace_id: Optional[str] = None,
+        trace_map: Optional[Dict[str, List[str]]] = None,
+    ) -> None:
+        pass
+
+
+callback_handler = MetricsCallbackHandler()
@@ -1,10 +1,61 @@
-from llama_index.core import VectorStoreIndex, Settings, Document
+from llama_index.core import VectorStoreIndex, Settings, Document, StorageContext
 from llama_index.core.node_parser import SentenceSplitter
-from llama_index.vector_stores.astra import AstraDBVectorStore
 from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.llms.openai import OpenAI
-from llama_index.core.callbacks import CallbackManager, LlamaDebugHandler
-from typing import List, Optional
+from llama_index.core.callbacks import CallbackManager
+from answer_cache import AnswerCache
+from astra_vector_store import AstraVectorStore
+from blocking import run_blocking
+from context_assembler import ContextAssembler
+from document_metadata import (
+    MergedRetriever,
+    PostFilterRetriever,
+    RetrievalFilters,
+    bill_metadata,
+    extract_metadata,
+    hidden_keys,
+)
+from embedding_batcher import wrap_with_batcher
+from embedding_cache import wrap_with_cache
+from jobs import ProgressCallback
+from journal_generator import JournalGenerator, SegmentCache
+from journal_store import JournalIndexStore, local_index_dir
+from lexical import HybridRetriever, LexicalIndex
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.core.schema import QueryBundle
+from local_vector_store import LocalVectorStore, MemoryVectorStore
+from metrics_handler import callback_handler
+from telemetry import record, timed
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, NamedTuple, Optional
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+async def _iterate_blocking(iterator: Iterator) -> AsyncIterator:
+    sentinel = object()
+    while True:
+        item = await run_blocking(next, iterator, sentinel)
+        if item is sentinel:
+            return
+        yield item
+
+
+EMBEDDING_DIMENSION = 1536
+MANIFEST_FILE = "manifest.json"
+LEXICAL_FILE = "lexical.jsonl"
+# Over-fetch factor when a store can only apply part of a filter
+POST_FILTER_FACTOR = 4
+# No bill numbers, so hybrid retrieval still reaches the vector store
+WARMUP_QUERY = "What bills were filed in the Senate this session?"
+
+
+class _JournalIndex(NamedTuple):
+    index: VectorStoreIndex
+    lexical: LexicalIndex
 
 
 class LlamaIndexRAG:
@@ -30,14 +81,45 @@ class LlamaIndexRAG:
         collection_name: Optional[str] = None,
         system_prompt: Optional[str] = None,
         use_default_prompt: bool = True,
+        journal_max_indexes: int = 32,
+        journal_max_nodes: Optional[int] = 200_000,
+        journal_max_bytes: Optional[int] = None,
+        journal_ttl_seconds: Optional[float] = 3600,
+        journal_index_retained: Optional[Callable[[str], bool]] = None,
+        embedding_cache_path: Optional[str] = None,
+        embedding_cache_max_entries: int = 500_000,
+        embedding_batch_max_size: int = 64,
+        embedding_batch_wait_ms: float = 5.0,
+        vector_store_backend: Optional[str] = None,
+        local_store_path: Optional[str] = None,
+        answer_cache_size: int = 0,
+        answer_cache_ttl_seconds: Optional[float] = 24 * 3600,
+        answer_cache_threshold: float = 0.95,
+        corpus_version: Optional[str] = None,
+        corpus_manifest_path: Optional[str] = None,
+        retrieval_mode: str = "vector",
+        context_token_budget: Optional[int] = 3000,
+        lexical_index_path: Optional[str] = None,
+        journal_generation_concurrency: int = 8,
+        journal_generation_cache_path: Optional[str] = None,
     ):
         # Initialization of the core systems
         self.system_type = system_type
-        self.debug_handler = LlamaDebugHandler()
-        callback_manager = CallbackManager([self.debug_handler])
+        # Bounded histograms and counters instead of a per-event debug trace
+        callback_manager = CallbackManager([callback_handler])
 
-        # Set embedding model
-        embed_model = OpenAIEmbedding(model="text-embedding-3-small")
+        # Set embedding model, cached on disk by (model, text) when configured;
+        # cache misses from concurrent requests are coalesced into one API call
+        embed_model = wrap_with_cache(
+            wrap_with_batcher(
+                OpenAIEmbedding(model="text-embedding-3-small"),
+                max_batch_size=embedding_batch_max_size,
+                max_wait_ms=embedding_batch_wait_ms,
+            ),
+            embedding_cache_path,
+            max_entries=embedding_cache_max_entries,
+        )
+        self.embed_model = embed_model
         Settings.embed_model = embed_model
         Settings.callback_manager = callback_manager
 
@@ -57,59 +139,643 @@ class LlamaIndexRAG:
         self.llm = OpenAI(**llm_config)
         Settings.llm = self.llm
 
+        # Where embeddings live: "astra" (general default), "memory" (journal
+        # default) or "local", an on-disk store under local_store_path
+        self.vector_store_backend = vector_store_backend or (
+            "astra" if system_type == "general" else "memory")
+        self.local_store_path = local_store_path
+        if self.vector_store_backend == "local" and not local_store_path:
+            raise ValueError("local_store_path is required for the 'local' vector store backend.")
+
+        # Repeated questions to the general assistant skip retrieval and the LLM
+        self.answer_cache = AnswerCache(
+            max_entries=answer_cache_size,
+            ttl_seconds=answer_cache_ttl_seconds,
+            similarity_threshold=answer_cache_threshold,
+        ) if answer_cache_size > 0 else None
+        self._corpus_version = corpus_version
+        self.corpus_manifest_path = corpus_manifest_path
+
+        # "hybrid" fuses a local BM25 index with vector search
+        if retrieval_mode not in ("vector", "hybrid"):
+            raise ValueError("Invalid retrieval mode. Must be 'vector' or 'hybrid'.")
+        self.retrieval_mode = retrieval_mode
+        self.lexical_index_path = lexical_index_path
+        # Manifest mtime the general lexical index was loaded at; ingestion
+        # saves the index right before each manifest write
+        self._lexical_manifest_mtime = self._manifest_mtime()
+        self._lexical_reload_lock = threading.Lock()
+        self._lexical_reloading = False
+
+        # Deduplicated, merged and budgeted context between retrieval and the LLM
+        self.context_assembler = ContextAssembler(token_budget=context_token_budget)
+
         # Set up system-specific configuration
-        if system_type == "general":
+        if system_type == "general" and self.vector_store_backend == "local":
+            self.vector_store = LocalVectorStore(local_store_path, EMBEDDING_DIMENSION)
+            self.index = VectorStoreIndex.from_vector_store(
+                vector_store=self.vector_store)
+            self.lexical_index = self._load_general_lexical_index()
+        elif system_type == "general":
             if not all([astra_token, astra_db_id, astra_db_region, astra_keyspace, collection_name]):
                 raise ValueError(
                     "Missing required Astra DB parameters for the 'general' system.")
-            self.vector_store = AstraDBVectorStore(
+            self.vector_store = AstraVectorStore(
                 token=astra_token,
                 api_endpoint=f"https://{astra_db_id}-{astra_db_region}.apps.astra.datastax.com",
                 collection_name=collection_name,
                 namespace=astra_keyspace,
-                embedding_dimension=1536,
+                embedding_dimension=EMBEDDING_DIMENSION,
             )
             self.index = VectorStoreIndex.from_vector_store(
                 vector_store=self.vector_store)
+            self.lexical_index = self._load_general_lexical_index()
         elif system_type == "journal":
             self.text_splitter = SentenceSplitter(
                 chunk_size=512, chunk_overlap=50)
-            self.pdf_index = None
+            # One index per uploaded document/session, never shared
+            self.journal_indexes = JournalIndexStore(
+                max_indexes=journal_max_indexes,
+                max_nodes=journal_max_nodes,
+                max_bytes=journal_max_bytes,
+                ttl_seconds=journal_ttl_seconds,
+            )
+            # Whether an on-disk index's document still exists; orphans are
+            # deleted when the indexes are reloaded
+            self.journal_index_retained = journal_index_retained
+            # Segment extraction and merging run without the journal system
+            # prompt; only the final write-up uses it, with room for a full journal.
+            # Merging gets the same room: its output spans several segments' notes.
+            map_config = {**llm_config, "max_tokens": 2048}
+            map_config.pop("system_prompt", None)
+            self.journal_generator = JournalGenerator(
+                llm=OpenAI(**map_config),
+                reduce_llm=OpenAI(**{**map_config, "max_tokens": 4096}),
+                final_llm=OpenAI(**{**llm_config, "max_tokens": 4096}),
+                text_splitter=self.text_splitter,
+                concurrency=journal_generation_concurrency,
+                cache=SegmentCache(journal_generation_cache_path)
+                if journal_generation_cache_path else None,
+            )
         else:
             raise ValueError(
                 "Invalid system type. Must be 'general' or 'journal'.")
 
-    def process_pdf_content(self, pdf_content: List[str]) -> None:
+    def _load_general_lexical_index(self) -> LexicalIndex:
+        # Persisted by ingestion; a local vector store can rebuild it from its rows
+        if self.lexical_index_path and os.path.exists(self.lexical_index_path):
+            return LexicalIndex.load(self.lexical_index_path)
+        lexical = LexicalIndex()
+        if isinstance(self.vector_store, LocalVectorStore):
+            lexical.add_nodes(self.vector_store.iter_nodes())
+        return lexical
+
+    def _manifest_mtime(self) -> Optional[float]:
+        if self.corpus_manifest_path and os.path.exists(self.corpus_manifest_path):
+            return os.path.getmtime(self.corpus_manifest_path)
+        return None
+
+    def _refresh_lexical_index(self) -> None:
+        # A running server picks up what an ingestion run added, reloading in
+        # the background while queries keep using the previous index
+        if not self.lexical_index_path:
+            return
+        mtime = self._manifest_mtime()
+        with self._lexical_reload_lock:
+            if self._lexical_reloading or mtime == self._lexical_manifest_mtime:
+                return
+            self._lexical_reloading = True
+            self._lexical_manifest_mtime = mtime
+        threading.Thread(target=self._reload_lexical_index, daemon=True).start()
+
+    def _reload_lexical_index(self) -> None:
+        try:
+            if os.path.exists(self.lexical_index_path):
+                self.lexical_index = LexicalIndex.load(self.lexical_index_path)
+        finally:
+            with self._lexical_reload_lock:
+                self._lexical_reloading = False
+
+    def add_to_lexical_index(self, nodes, persist: bool = True) -> None:
+        self.lexical_index.add_nodes(nodes)
+        if persist and self.lexical_index_path:
+            self.lexical_index.save(self.lexical_index_path)
+
+    def process_pdf_content(
+        self,
+        pdf_content: List[str],
+        index_id: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+    ) -> str:
         if self.system_type != "journal":
             raise RuntimeError(
                 "PDF processing is only available for the 'journal' system.")
-        full_text = "\n".join(pdf_content)
-        document = Document(text=full_text)
-        self.pdf_index = VectorStoreIndex.from_documents(
-            [document], show_progress=True)
-
-    def query(self, question: str) -> str:
-        if self.system_type == "journal" and self.pdf_index:
-            query_engine = self.pdf_index.as_query_engine(
-                similarity_top_k=5, streaming=True)
-        elif self.system_type == "general":
-            query_engine = self.index.as_query_engine(
-                similarity_top_k=5, streaming=True)
+        # Without an explicit session key, identical transcripts share one index
+        index_id = index_id or hashlib.sha256(
+            "\n".join(pdf_content).encode("utf-8")).hexdigest()
+        if index_id in self.journal_indexes or self._load_local_index(index_id) is not None:
+            return index_id
+        with timed("index_build"):
+            entry, node_count, size_bytes = self._build_page_index(index_id, pdf_content, progress)
+        self.journal_indexes.put(index_id, entry, node_count, size_bytes)
+        if progress:
+            progress("index", 1, 1)
+        return index_id
+
+    def _new_journal_index(self, index_id: str) -> VectorStoreIndex:
+        if self.vector_store_backend != "local":
+            return VectorStoreIndex(nodes=[], storage_context=StorageContext.from_defaults(
+                vector_store=MemoryVectorStore()))
+        directory = self._local_index_dir(index_id)
+        # Anything already here is left over from an interrupted build
+        shutil.rmtree(directory, ignore_errors=True)
+        store = LocalVectorStore(directory, EMBEDDING_DIMENSION)
+        return VectorStoreIndex(
+            nodes=[], storage_context=StorageContext.from_defaults(vector_store=store))
+
+    def _local_index_dir(self, index_id: str) -> str:
+        return local_index_dir(self.local_store_path, index_id)
+
+    def delete_index(self, index_id: str) -> None:
+        # Drops a journal index from memory and, for the local backend, from disk
+        self.journal_indexes.discard(index_id)
+        if self.vector_store_backend == "local":
+            shutil.rmtree(self._local_index_dir(index_id), ignore_errors=True)
+
+    def _load_local_index(self, index_id: str) -> Optional[_JournalIndex]:
+        if self.vector_store_backend != "local":
+            return None
+        manifest_path = os.path.join(self._local_index_dir(index_id), MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        return self._open_local_index(manifest)
+
+    def _open_local_index(self, manifest: Dict[str, Any]) -> _JournalIndex:
+        directory = self._local_index_dir(manifest["index_id"])
+        store = LocalVectorStore(directory, EMBEDDING_DIMENSION)
+        lexical_path = os.path.join(directory, LEXICAL_FILE)
+        if os.path.exists(lexical_path):
+            lexical = LexicalIndex.load(lexical_path)
+        else:
+            lexical = LexicalIndex()
+            lexical.add_nodes(store.iter_nodes())
+        entry = _JournalIndex(VectorStoreIndex.from_vector_store(vector_store=store), lexical)
+        self.journal_indexes.put(
+            manifest["index_id"], entry, manifest["node_count"], manifest["size_bytes"])
+        return entry
+
+    def load_local_indexes(self) -> int:
+        # Reopen the most recently built on-disk journal indexes without
+        # re-embedding, no more than the resident store keeps; the rest stay
+        # on disk and are opened on demand. Orphaned indexes are deleted.
+        if self.system_type != "journal" or self.vector_store_backend != "local":
+            return 0
+        if not os.path.isdir(self.local_store_path):
+            return 0
+        manifests = []
+        for name in os.listdir(self.local_store_path):
+            manifest_path = os.path.join(self.local_store_path, name, MANIFEST_FILE)
+            if not os.path.exists(manifest_path):
+                continue
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            retained = self.journal_index_retained
+            if retained is not None and not retained(manifest["index_id"]):
+                shutil.rmtree(os.path.join(self.local_store_path, name), ignore_errors=True)
+                continue
+            manifests.append((os.path.getmtime(manifest_path), manifest))
+        manifests.sort(key=lambda item: item[0], reverse=True)
+        newest = manifests[:self.journal_indexes.max_indexes]
+        loaded = 0
+        # Oldest first, so the newest end up most recently used
+        for _, manifest in reversed(newest):
+            if manifest["index_id"] not in self.journal_indexes:
+                self._open_local_index(manifest)
+                loaded += 1
+        return loaded
+
+    def _build_page_index(
+        self,
+        index_id: str,
+        pages: List[str],
+        progress: Optional[ProgressCallback] = None,
+    ):
+        # Split and embed page by page, flushing one embedding batch at a time,
+        # so only a batch of nodes is ever pending outside the index
+        report = progress or (lambda stage, done, total: None)
+        index = self._new_journal_index(index_id)
+        lexical = LexicalIndex()
+        batch_size = self.embed_model.embed_batch_size
+        pending = []
+        node_count = 0
+        embedded = 0
+        size_bytes = 0
+
+        def flush():
+            nonlocal pending, embedded
+            index.insert_nodes(pending)
+            lexical.add_nodes(pending)
+            embedded += len(pending)
+            pending = []
+            report("embed", embedded, node_count)
+
+        # Session-level fields (date, year, congress, type) come from the first page;
+        # bills are flagged per chunk so a filter narrows to where they come up
+        session_metadata = {
+            key: value for key, value in extract_metadata("", pages).items()
+            if key in ("date", "year", "congress", "document_type")
+        }
+        for page_number, page in enumerate(pages, start=1):
+            metadata = {"page": page_number, **session_metadata}
+            document = Document(
+                text=page,
+                metadata=metadata,
+                excluded_embed_metadata_keys=hidden_keys(metadata, embed=True),
+                excluded_llm_metadata_keys=hidden_keys(metadata),
+            )
+            for node in self.text_splitter.get_nodes_from_documents([document]):
+                node.metadata.update(bill_metadata(node.get_content()))
+                node.excluded_embed_metadata_keys = hidden_keys(node.metadata, embed=True)
+                node.excluded_llm_metadata_keys = hidden_keys(node.metadata)
+                pending.append(node)
+                node_count += 1
+                size_bytes += len(node.get_content().encode("utf-8")) + EMBEDDING_DIMENSION * 8
+            report("split", page_number, len(pages))
+            if len(pending) >= batch_size:
+                flush()
+        if pending:
+            flush()
+        if self.vector_store_backend == "local":
+            lexical.save(os.path.join(self._local_index_dir(index_id), LEXICAL_FILE))
+            # Written last, so only complete indexes are ever reloaded
+            manifest = {"index_id": index_id, "node_count": node_count, "size_bytes": size_bytes}
+            with open(os.path.join(self._local_index_dir(index_id), MANIFEST_FILE), "w") as f:
+                json.dump(manifest, f)
+        return _JournalIndex(index, lexical), node_count, size_bytes
+
+    def _journal_entry(self, index_id: Optional[str]) -> Optional[_JournalIndex]:
+        if not index_id:
+            return None
+        entry = self.journal_indexes.get(index_id)
+        return entry if entry is not None else self._load_local_index(index_id)
+
+    def has_index(self, index_id: str) -> bool:
+        # Resident, or persisted on disk and reopened now without re-embedding
+        return self._journal_entry(index_id) is not None
+
+    def _active_index(self, index_id: Optional[str] = None) -> Optional[VectorStoreIndex]:
+        if self.system_type == "journal":
+            entry = self._journal_entry(index_id)
+            return entry.index if entry is not None else None
+        return self.index
+
+    def _retriever(
+        self,
+        index: VectorStoreIndex,
+        index_id: Optional[str],
+        similarity_top_k: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> BaseRetriever:
+        retrieval_filters = RetrievalFilters.from_dict(filters)
+        filter_sets, exact, where = [None], True, None
+        if retrieval_filters is not None:
+            # The local store evaluates every filter; the others (Astra) only
+            # equality, so query per bill and year, over-fetch and finish the
+            # job after retrieval
+            filter_sets, exact = retrieval_filters.to_metadata_filters(
+                equality_only=not isinstance(index.vector_store, LocalVectorStore))
+            where = retrieval_filters.matches
+        top_k = similarity_top_k if exact else similarity_top_k * POST_FILTER_FACTOR
+        retrievers = [
+            index.as_retriever(similarity_top_k=top_k, filters=metadata_filters)
+            for metadata_filters in filter_sets
+        ]
+        retriever = retrievers[0] if len(retrievers) == 1 else MergedRetriever(
+            retrievers, top_k, self.embed_model)
+        if self.retrieval_mode == "hybrid":
+            if self.system_type == "journal":
+                lexical = self._journal_entry(index_id).lexical
+            else:
+                self._refresh_lexical_index()
+                lexical = self.lexical_index
+            if len(lexical) > 0:
+                retriever = HybridRetriever(retriever, lexical, similarity_top_k=top_k, where=where)
+        if not exact:
+            retriever = PostFilterRetriever(retriever, retrieval_filters, similarity_top_k)
+        return retriever
+
+    def _query_engine(
+        self,
+        index: VectorStoreIndex,
+        index_id: Optional[str],
+        similarity_top_k: int,
+        streaming: bool = False,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> RetrieverQueryEngine:
+        # Always this system's LLM: Settings.llm is process-wide and is
+        # overwritten by whichever system was constructed last
+        return RetrieverQueryEngine.from_args(
+            self._retriever(index, index_id, similarity_top_k, filters),
+            llm=self.llm,
+            streaming=streaming,
+            node_postprocessors=[self.context_assembler],
+        )
+
+    @staticmethod
+    def _serialize_nodes(nodes) -> List[Dict[str, Any]]:
+        return [
+            {
+                "text": node.node.get_content(),
+                "score": node.score,
+                "metadata": node.node.metadata,
+            }
+            for node in nodes
+        ]
+
+    def corpus_version(self) -> Optional[str]:
+        # Cached answers are only valid for the corpus version they came from
+        if self._corpus_version is not None:
+            return self._corpus_version
+        mtime = self._manifest_mtime()
+        if mtime is not None:
+            # Rewritten by every ingestion run
+            return str(mtime)
+        if isinstance(getattr(self, "vector_store", None), LocalVectorStore):
+            return str(len(self.vector_store))
+        return None
+
+    def set_corpus_version(self, version: Optional[str]) -> None:
+        self._corpus_version = version
+
+    def _answer_cacheable(
+        self, index_id: Optional[str], filters: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        # Filtered answers depend on more than the question, so they bypass the cache
+        return (
+            self.answer_cache is not None
+            and self.system_type == "general"
+            and index_id is None
+            and RetrievalFilters.from_dict(filters) is None
+        )
+
+    def _retrieves_lexically(self, question: str, similarity_top_k: int) -> bool:
+        # Exact-identifier questions that hybrid retrieval answers from BM25
+        # alone; embedding them just for the near-duplicate lookup would add
+        # the very call retrieval skips
+        retriever = self._retriever(self.index, None, similarity_top_k)
+        return isinstance(retriever, HybridRetriever) and retriever.decisive(question)
+
+    def _lookup_answer(
+        self,
+        question: str,
+        index_id: Optional[str],
+        filters: Optional[Dict[str, Any]] = None,
+        similarity_top_k: int = 5,
+    ):
+        if not self._answer_cacheable(index_id, filters):
+            return None, None
+        version = self.corpus_version()
+        cached = self.answer_cache.get_exact(question, version)
+        if cached is not None:
+            return cached, None
+        if self._retrieves_lexically(question, similarity_top_k):
+            self.answer_cache.record_miss()
+            return None, None
+        # Reused by retrieval through the embedding cache, so this is not extra work
+        embedding = self.embed_model.get_query_embedding(question)
+        return self.answer_cache.get_similar(question, embedding, version), embedding
+
+    async def _alookup_answer(
+        self,
+        question: str,
+        index_id: Optional[str],
+        filters: Optional[Dict[str, Any]] = None,
+        similarity_top_k: int = 5,
+    ):
+        if not self._answer_cacheable(index_id, filters):
+            return None, None
+        version = self.corpus_version()
+        cached = self.answer_cache.get_exact(question, version)
+        if cached is not None:
+            return cached, None
+        if await run_blocking(self._retrieves_lexically, question, similarity_top_k):
+            self.answer_cache.record_miss()
+            return None, None
+        embedding = await self.embed_model.aget_query_embedding(question)
+        return self.answer_cache.get_similar(question, embedding, version), embedding
+
+    @staticmethod
+    def _query_bundle(question: str, embedding: Optional[List[float]]):
+        # The answer cache lookup already embedded the question; hand that
+        # embedding to retrieval instead of requesting it a second time
+        return QueryBundle(question, embedding=embedding) if embedding is not None else question
+
+    def _store_answer(
+        self,
+        question: str,
+        index_id: Optional[str],
+        answer: Dict[str, Any],
+        embedding: Optional[List[float]],
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        if self._answer_cacheable(index_id, filters):
+            self.answer_cache.put(question, answer, embedding, self.corpus_version())
+
+    def query_with_sources(
+        self,
+        question: str,
+        similarity_top_k: int = 5,
+        index_id: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        # Retrieve once and synthesize from the same nodes, so the sources
+        # returned are exactly the context the LLM saw
+        index = self._active_index(index_id)
+        if index is None:
+            return {"response": "No data available for querying.", "sources": []}
+        cached, embedding = self._lookup_answer(
+            question, index_id, filters, similarity_top_k)
+        if cached is not None:
+            return cached
+        query_engine = self._query_engine(
+            index, index_id, similarity_top_k, filters=filters)
+        response = query_engine.query(self._query_bundle(question, embedding))
+        result = {
+            "response": str(response),
+            "sources": self._serialize_nodes(response.source_nodes),
+        }
+        self._store_answer(question, index_id, result, embedding, filters)
+        return result
+
+    def stream_query(
+        self,
+        question: str,
+        similarity_top_k: int = 5,
+        index_id: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        # Yields token frames as the LLM produces them, then one sources frame
+        index = self._active_index(index_id)
+        if index is None:
+            yield {"type": "token", "content": "No data available for querying."}
+            yield {"type": "sources", "sources": []}
+            return
+        cached, embedding = self._lookup_answer(
+            question, index_id, filters, similarity_top_k)
+        if cached is not None:
+            yield {"type": "token", "content": cached["response"]}
+            yield {"type": "sources", "sources": cached["sources"]}
+            return
+        started = time.perf_counter()
+        query_engine = self._query_engine(
+            index, index_id, similarity_top_k, streaming=True, filters=filters)
+        response = query_engine.query(self._query_bundle(question, embedding))
+        tokens = []
+        for token in response.response_gen:
+            if not tokens:
+                record("first_token", time.perf_counter() - started)
+            tokens.append(token)
+            yield {"type": "token", "content": token}
+        sources = self._serialize_nodes(response.source_nodes)
+        yield {"type": "sources", "sources": sources}
+        self._store_answer(
+            question, index_id, {"response": "".join(tokens), "sources": sources}, embedding,
+            filters)
+
+    async def aquery_with_sources(
+        self,
+        question: str,
+        similarity_top_k: int = 5,
+        index_id: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        index = self._active_index(index_id)
+        if index is None:
+            return {"response": "No data available for querying.", "sources": []}
+        cached, embedding = await self._alookup_answer(
+            question, index_id, filters, similarity_top_k)
+        if cached is not None:
+            return cached
+        query_engine = self._query_engine(
+            index, index_id, similarity_top_k, filters=filters)
+        response = await query_engine.aquery(self._query_bundle(question, embedding))
+        result = {
+            "response": str(response),
+            "sources": self._serialize_nodes(response.source_nodes),
+        }
+        self._store_answer(question, index_id, result, embedding, filters)
+        return result
+
+    async def astream_query(
+        self,
+        question: str,
+        similarity_top_k: int = 5,
+        index_id: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        index = self._active_index(index_id)
+        if index is None:
+            yield {"type": "token", "content": "No data available for querying."}
+            yield {"type": "sources", "sources": []}
+            return
+        cached, embedding = await self._alookup_answer(
+            question, index_id, filters, similarity_top_k)
+        if cached is not None:
+            yield {"type": "token", "content": cached["response"]}
+            yield {"type": "sources", "sources": cached["sources"]}
+            return
+        started = time.perf_counter()
+        query_engine = self._query_engine(
+            index, index_id, similarity_top_k, streaming=True, filters=filters)
+        response = await query_engine.aquery(self._query_bundle(question, embedding))
+        if hasattr(response, "async_response_gen"):
+            token_gen = response.async_response_gen()
         else:
-            return "No data available for querying."
-        return str(query_engine.query(question))
+            # Synthesizers without async streaming hand back a sync generator
+            token_gen = _iterate_blocking(response.response_gen)
+        tokens = []
+        async for token in token_gen:
+            if not tokens:
+                # Retrieval included: this is the wait the user sees
+                record("first_token", time.perf_counter() - started)
+            tokens.append(token)
+            yield {"type": "token", "content": token}
+        sources = self._serialize_nodes(response.source_nodes)
+        yield {"type": "sources", "sources": sources}
+        self._store_answer(
+            question, index_id, {"response": "".join(tokens), "sources": sources}, embedding,
+            filters)
 
-    def get_relevant_nodes(self, question: str) -> List[str]:
-        if self.system_type == "journal" and not self.pdf_index:
+    async def aretrieve(
+        self,
+        question: str,
+        similarity_top_k: int = 5,
+        index_id: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        index = self._active_index(index_id)
+        if index is None:
             raise RuntimeError(
                 "PDF index is not initialized. Please process the PDF content first.")
+        retriever = self._retriever(index, index_id, similarity_top_k, filters)
+        nodes = await retriever.aretrieve(question)
+        return self._serialize_nodes(nodes)
 
-        # Use the appropriate retriever based on the system type
-        retriever = (
-            self.pdf_index.as_retriever(similarity_top_k=5)
-            if self.system_type == "journal" and self.pdf_index
-            else self.index.as_retriever(similarity_top_k=5)
-        )
+    async def awarmup(self) -> Dict[str, Any]:
+        # Opens the OpenAI (and vector store) connections and loads persisted
+        # indexes before the first request has to
+        report: Dict[str, Any] = {}
+        if self.system_type == "journal":
+            report["local_indexes"] = await run_blocking(self.load_local_indexes)
+        # Past the embedding cache, which would otherwise answer the canary
+        embed_model = getattr(self.embed_model, "inner", self.embed_model)
+        await embed_model.aget_query_embedding(WARMUP_QUERY)
+        if self.system_type == "general":
+            retriever = self.index.as_retriever(similarity_top_k=1)
+            report["canary_nodes"] = len(await retriever.aretrieve(WARMUP_QUERY))
+        return report
+
+    async def agenerate_journal(
+        self,
+        pdf_content: List[str],
+        progress: Optional[ProgressCallback] = None,
+    ) -> str:
+        if self.system_type != "journal":
+            raise RuntimeError(
+                "Journal generation is only available for the 'journal' system.")
+        with timed("journal_generate"):
+            return await self.journal_generator.agenerate(pdf_content, progress)
+
+    async def aprocess_pdf_content(
+        self,
+        pdf_content: List[str],
+        index_id: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+    ) -> str:
+        return await run_blocking(self.process_pdf_content, pdf_content, index_id, progress)
+
+    def query(
+        self,
+        question: str,
+        index_id: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        return self.query_with_sources(question, index_id=index_id, filters=filters)["response"]
+
+    def get_relevant_nodes(
+        self,
+        question: str,
+        index_id: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[str]:
+        index = self._active_index(index_id)
+        if index is None:
+            raise RuntimeError(
+                "PDF index is not initialized. Please process the PDF content first.")
+
+        retriever = self._retriever(index, index_id, 5, filters)
 
         # Retrieve nodes
         nodes = retriever.retrieve(question)
@@ -0,0 +1,104 @@
+from blocking import run_blocking
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import time
+
+PENDING = "pending"
+STARTING = "starting"
+READY = "ready"
+FAILED = "failed"
+
+
+class SystemUnavailableError(Exception):
+    def __init__(self, name: str, error: str):
+        super().__init__(f"The '{name}' system is unavailable: {error}")
+        self.name = name
+        self.error = error
+
+
+class SystemRegistry:
+    # Builds each RAG system on first use (or on warmup) instead of at import,
+    # so the server binds immediately and one failing backend only takes its
+    # own endpoints down. Failed builds are retried after retry_seconds.
+
+    def __init__(self, retry_seconds: float = 30.0):
+        self.retry_seconds = retry_seconds
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._warmups: Dict[str, Optional[Callable[[Any], Awaitable[Any]]]] = {}
+        self._systems: Dict[str, Any] = {}
+        self._builds: Dict[str, asyncio.Task] = {}
+        self._state: Dict[str, Dict[str, Any]] = {}
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        warmup: Optional[Callable[[Any], Awaitable[Any]]] = None,
+    ) -> None:
+        self._factories[name] = factory
+        self._warmups[name] = warmup
+        self._state[name] = {"state": PENDING, "error": None, "init_seconds": None,
+                             "warmed": False, "warmup": None}
+
+    def names(self) -> List[str]:
+        return list(self._factories)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._factories
+
+    def peek(self, name: str) -> Optional[Any]:
+        # The system if it is already built; never triggers a build
+        return self._systems.get(name)
+
+    async def get(self, name: str) -> Any:
+        system = self._systems.get(name)
+        if system is not None:
+            return system
+        task = self._builds.get(name)
+        if task is None:
+            state = self._state[name]
+            if state["state"] == FAILED and time.time() - state["failed_at"] < self.retry_seconds:
+                raise SystemUnavailableError(name, state["error"])
+            task = asyncio.create_task(self._build(name))
+            self._builds[name] = task
+            task.add_done_callback(lambda t: self._builds.pop(name, None))
+        # Callers going away must not cancel a build others are waiting on
+        return await asyncio.shield(task)
+
+    async def _build(self, name: str) -> Any:
+        state = self._state[name]
+        state.update(state=STARTING, error=None)
+        started = time.monotonic()
+        try:
+            system = await run_blocking(self._factories[name])
+        except Exception as e:
+            state.update(state=FAILED, error=str(e), failed_at=time.time())
+            raise SystemUnavailableError(name, str(e)) from e
+        self._systems[name] = system
+        state.update(state=READY, init_seconds=round(time.monotonic() - started, 3))
+        return system
+
+    async def warm(self, name: str) -> None:
+        system = await self.get(name)
+        warmup = self._warmups[name]
+        if warmup is None or self._state[name]["warmed"]:
+            return
+        state = self._state[name]
+        try:
+            state["warmup"] = await warmup(system)
+            state["warmed"] = True
+        except Exception as e:
+            # A failed warmup leaves the system usable, just cold
+            state["warmup"] = {"error": str(e)}
+
+    async def warm_all(self) -> None:
+        await asyncio.gather(*(self.warm(name) for name in self._factories), return_exceptions=True)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {key: value for key, value in state.items() if key != "failed_at"}
+            for name, state in self._state.items()
+        }
+
+    def ready(self, names: Optional[List[str]] = None) -> bool:
+        return all(self._state[name]["state"] == READY for name in names or self._factories)
@@ -0,0 +1,149 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import bisect
+import threading
+import time
+
+# Upper bounds in seconds; covers a cached lookup up to a long journal build
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+# A collector returns (name, labels, value) samples read at scrape time
+Collector = Callable[[], List[Tuple[str, Dict[str, Any], float]]]
+
+
+class Histogram:
+    # Fixed buckets, so memory stays constant however many observations land
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    # Process-wide histograms and counters keyed by a small, fixed set of
+    # label values (stages, routes), rendered in Prometheus text format
+
+    def __init__(self, prefix: str = "rag"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._collectors: List[Collector] = []
+
+    @staticmethod
+    def _labels(labels: Dict[str, Any]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        key = self._labels(labels)
+        with self._lock:
+            family = self._histograms.setdefault(name, {})
+            histogram = family.get(key)
+            if histogram is None:
+                histogram = family[key] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = self._labels(labels)
+        with self._lock:
+            family = self._counters.setdefault(name, {})
+            family[key] = family.get(key, 0) + value
+
+    def add_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    @staticmethod
+    def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(labels) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        escaped = (value.replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+        return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            histograms = {
+                name: {key: (list(h.counts), h.sum, h.count, h.buckets) for key, h in family.items()}
+                for name, family in self._histograms.items()
+            }
+            counters = {name: dict(family) for name, family in self._counters.items()}
+        for name, family in sorted(histograms.items()):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            for labels, (counts, total, count, buckets) in sorted(family.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(
+                        f"{metric}_bucket{self._format_labels(labels, ('le', le))} {cumulative}")
+                lines.append(f"{metric}_sum{self._format_labels(labels)} {total}")
+                lines.append(f"{metric}_count{self._format_labels(labels)} {count}")
+        for name, family in sorted(counters.items()):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} counter")
+            for labels, value in sorted(family.items()):
+                lines.append(f"{metric}{self._format_labels(labels)} {value}")
+        gauges: Dict[str, List[str]] = {}
+        for collector in self._collectors:
+            try:
+                samples = collector()
+            except Exception:
+                continue  # One broken source must not fail the whole scrape
+            for name, labels, value in samples:
+                metric = f"{self.prefix}_{name}"
+                gauges.setdefault(metric, []).append(
+                    f"{metric}{self._format_labels(self._labels(labels))} {float(value)}")
+        for metric, samples in sorted(gauges.items()):
+            lines.append(f"# TYPE {metric} gauge")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+# Stage -> seconds for the request being served, when timing headers are on
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "request_timings", default=None)
+
+
+def record(stage: str, seconds: float) -> None:
+    metrics.observe("stage_seconds", seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started)
+
+
+@contextmanager
+def request_timings() -> Iterator[Dict[str, float]]:
+    timings: Dict[str, float] = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
@@ -0,0 +1,67 @@
+from typing import Any, Dict, List
+import numpy as np
+
+DELETE_MANY_LIMIT = 20
+
+
+def _lookup(document: Dict[str, Any], path: str) -> Any:
+    value: Any = document
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+class FakeCollection:
+    # Just the astrapy collection calls AstraDBVectorStore makes, with the
+    # Data API's semantics: rows keyed by _id, deleteOne by _id only, and
+    # deleteMany bounded per call with a moreData flag
+
+    def __init__(self):
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self.vector_finds = 0
+
+    def insert_many(self, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        for document in documents:
+            self.rows[document["_id"]] = document
+        return {"status": {"insertedIds": [d["_id"] for d in documents]}}
+
+    def delete_one(self, id: str) -> Dict[str, Any]:
+        return {"status": {"deletedCount": int(self.rows.pop(id, None) is not None)}}
+
+    delete = delete_one
+
+    def _matching(self, filter: Dict[str, Any]) -> List[str]:
+        return [
+            row_id for row_id, row in self.rows.items()
+            if all(_lookup(row, key) == value for key, value in filter.items())
+        ]
+
+    def delete_many(self, filter: Dict[str, Any]) -> Dict[str, Any]:
+        matching = self._matching(filter)
+        for row_id in matching[:DELETE_MANY_LIMIT]:
+            del self.rows[row_id]
+        status: Dict[str, Any] = {"deletedCount": min(len(matching), DELETE_MANY_LIMIT)}
+        if len(matching) > DELETE_MANY_LIMIT:
+            status["moreData"] = True
+        return {"status": status}
+
+    def vector_find(self, vector: List[float], limit: int, filter: Dict[str, Any]) -> List[Dict[str, Any]]:
+        self.vector_finds += 1
+        query = np.asarray(vector, dtype=np.float32)
+        scored = []
+        for row_id in self._matching(filter):
+            row = self.rows[row_id]
+            scored.append((float(np.dot(query, np.asarray(row["$vector"], dtype=np.float32))), row))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [{**row, "$similarity": score} for score, row in scored[:limit]]
+
+
+class FakeAstraDB:
+    def __init__(self, collection: FakeCollection):
+        self._collection = collection
+
+    def __call__(self, **kwargs) -> "FakeAstraDB":
+        return self
+
+    def create_collection(self, **kwargs) -> FakeCollection:
+        return self._collection
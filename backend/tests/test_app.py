@@ -0,0 +1,26 @@
+from fastapi.testclient import TestClient
+import importlib
+import pytest
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    # Everything the app writes goes under .cache in the working directory.
+    # No journal workers, so generation jobs stay queued.
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("RAG_WARMUP", "false")
+    monkeypatch.setenv("JOURNAL_JOB_CONCURRENCY", "0")
+    import app
+    return importlib.reload(app)
+
+
+def test_cancel_queued_journal_job(app_module):
+    document_id = app_module.documents.save(["Session No. 1, Monday, May 6, 2024"])
+    with TestClient(app_module.app) as client:
+        job = client.post("/api/journal/generate", json={"document_id": document_id}).json()
+        assert job["status"] == "queued"
+
+        response = client.delete(f"/api/jobs/{job['job_id']}")
+        assert response.status_code == 200
+        assert response.json() == {"job_id": job["job_id"], "status": "cancelled"}
+        assert client.get(f"/api/jobs/{job['job_id']}").json()["status"] == "cancelled"
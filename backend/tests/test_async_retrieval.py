@@ -0,0 +1,108 @@
+from fake_astra import FakeAstraDB, FakeCollection
+from lexical import HybridRetriever, LexicalIndex
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery
+from local_vector_store import LocalVectorStore, MemoryVectorStore
+import asyncio
+import llama_index.vector_stores.astra.base as astra_base
+import pytest
+import time
+
+SLOW = 0.3
+
+
+async def run_watching_loop(coro):
+    # The longest the event loop went without running a 10 ms ticker
+    gaps = []
+    done = asyncio.Event()
+
+    async def ticker():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+            if done.is_set():
+                return
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)  # Ticking before the work starts
+    try:
+        result = await coro
+    finally:
+        done.set()
+        await task
+    return result, max(gaps)
+
+
+def nodes():
+    return [
+        TextNode(id_=f"n{i}", text=f"Senate Bill No. {2650 + i} was approved",
+                 embedding=[float(i == j) for j in range(8)])
+        for i in range(8)
+    ]
+
+
+class SlowCollection(FakeCollection):
+    def vector_find(self, *args, **kwargs):
+        time.sleep(SLOW)
+        return super().vector_find(*args, **kwargs)
+
+
+def astra_store(monkeypatch):
+    from astra_vector_store import AstraVectorStore
+    monkeypatch.setattr(astra_base, "AstraDB", FakeAstraDB(SlowCollection()))
+    return AstraVectorStore(
+        token="token", api_endpoint="https://db.example", collection_name="general",
+        embedding_dimension=8)
+
+
+def local_store(monkeypatch, tmp_path):
+    store = LocalVectorStore(str(tmp_path), 8)
+    query = LocalVectorStore.query
+    monkeypatch.setattr(LocalVectorStore, "query",
+                        lambda self, *a, **kw: (time.sleep(SLOW), query(self, *a, **kw))[1])
+    return store
+
+
+def memory_store(monkeypatch, tmp_path):
+    store = MemoryVectorStore()
+    query = MemoryVectorStore.query
+    monkeypatch.setattr(MemoryVectorStore, "query",
+                        lambda self, *a, **kw: (time.sleep(SLOW), query(self, *a, **kw))[1])
+    return store
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda monkeypatch, tmp_path: astra_store(monkeypatch),
+    local_store,
+    memory_store,
+], ids=["astra", "local", "memory"])
+def test_store_queries_leave_the_loop_free(monkeypatch, tmp_path, make_store):
+    store = make_store(monkeypatch, tmp_path)
+    store.add(nodes())
+    query = VectorStoreQuery(query_embedding=[1.0] + [0.0] * 7, similarity_top_k=2)
+
+    result, stall = asyncio.run(run_watching_loop(store.aquery(query)))
+    assert result.ids[0] == "n0"
+    assert stall < SLOW / 2
+
+
+class EmptyRetriever(BaseRetriever):
+    def _retrieve(self, query_bundle):
+        return []
+
+
+def test_hybrid_bm25_leaves_the_loop_free(monkeypatch):
+    lexical = LexicalIndex()
+    lexical.add_nodes(nodes())
+    search = LexicalIndex.search
+    monkeypatch.setattr(LexicalIndex, "search",
+                        lambda self, *a, **kw: (time.sleep(SLOW), search(self, *a, **kw))[1])
+    retriever = HybridRetriever(EmptyRetriever(), lexical, similarity_top_k=1)
+
+    results, stall = asyncio.run(run_watching_loop(retriever.aretrieve("SB 2651")))
+    assert [r.node.node_id for r in results] == ["n1"]
+    assert stall < SLOW / 2
@@ -0,0 +1,19 @@
+from benchmark import configure_environment
+import argparse
+import os
+import re
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def test_every_on_disk_path_is_redirected_into_the_workdir(tmp_path, monkeypatch):
+    with open(APP_PATH, encoding="utf-8") as f:
+        cache_variables = set(re.findall(r'os\.getenv\(\s*"(\w+)",\s*"\.cache/', f.read()))
+    assert "BILL_TIMELINE_PATH" in cache_variables
+
+    for name in cache_variables:
+        monkeypatch.delenv(name, raising=False)
+    args = argparse.Namespace(retrieval_mode="hybrid", embedding_cache=True, answer_cache=True)
+    configure_environment(args, str(tmp_path), 8000)
+    for name in cache_variables:
+        assert os.environ[name].startswith(str(tmp_path)), name
@@ -0,0 +1,89 @@
+from document_metadata import MergedRetriever, RetrievalFilters
+from llama_index.core import StorageContext, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.schema import TextNode
+from local_vector_store import MemoryVectorStore
+import asyncio
+
+
+class CountingEmbedding(MockEmbedding):
+    queries: int = 0
+
+    def _get_query_embedding(self, query):
+        self.queries += 1
+        return super()._get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query):
+        self.queries += 1
+        return await super()._aget_query_embedding(query)
+
+
+def filtered_retriever(embed_model):
+    nodes = [
+        TextNode(id_=f"{year}-{i}", text=f"Session of {year}, chunk {i}", embedding=[1.0] * 8,
+                 metadata={"date": f"{year}-06-0{i + 1}", "year": year})
+        for year in (2022, 2023, 2024) for i in range(3)
+    ]
+    index = VectorStoreIndex(
+        nodes, embed_model=embed_model,
+        storage_context=StorageContext.from_defaults(vector_store=MemoryVectorStore()))
+    filter_sets, _ = RetrievalFilters(
+        date_from="2023-01-01", date_to="2024-12-31").to_metadata_filters(equality_only=True)
+    assert len(filter_sets) == 2
+    retrievers = [
+        index.as_retriever(similarity_top_k=4, filters=filters, embed_model=embed_model)
+        for filters in filter_sets
+    ]
+    return MergedRetriever(retrievers, 4, embed_model)
+
+
+def node_years(results):
+    return {result.node.metadata["year"] for result in results}
+
+
+def test_merged_retriever_embeds_the_question_once():
+    embed_model = CountingEmbedding(embed_dim=8)
+    retriever = filtered_retriever(embed_model)
+
+    results = asyncio.run(retriever.aretrieve("What did the Senate approve?"))
+    assert embed_model.queries == 1
+    assert len(results) == 4 and node_years(results) <= {2023, 2024}
+
+    results = retriever.retrieve("What did the Senate refer to committee?")
+    assert embed_model.queries == 2
+    assert node_years(results) <= {2023, 2024}
+
+
+def test_equality_only_date_range_queries_each_year():
+    filter_sets, exact = RetrievalFilters(
+        date_from="2023-11-01", date_to="2024-02-01").to_metadata_filters(equality_only=True)
+    assert not exact  # The exact bounds are checked after retrieval
+    assert [f.filters[0].value for f in filter_sets] == [2023, 2024]
+
+
+def test_bill_filters_select_flagged_chunks(tmp_path):
+    from local_vector_store import LocalVectorStore
+    from document_metadata import bill_metadata
+    embed_model = MockEmbedding(embed_dim=8)
+    nodes = [
+        TextNode(id_=f"{bill}-{i}", text=f"{bill} chunk {i}", embedding=[1.0] * 8,
+                 metadata=bill_metadata(f"Senate Bill No. {bill[2:]}"))
+        for bill in ("sb2654", "sb2655", "sb2656") for i in range(3)
+    ]
+    filters = RetrievalFilters.from_dict({"bills": ["SB 2654", "Senate Bill No. 2655"]})
+    for store, equality_only in (
+        (MemoryVectorStore(), True),
+        (LocalVectorStore(str(tmp_path), 8), False),
+    ):
+        index = VectorStoreIndex(
+            nodes, embed_model=embed_model,
+            storage_context=StorageContext.from_defaults(vector_store=store))
+        filter_sets, exact = filters.to_metadata_filters(equality_only=equality_only)
+        assert exact
+        retrievers = [
+            index.as_retriever(similarity_top_k=9, filters=f, embed_model=embed_model)
+            for f in filter_sets
+        ]
+        results = MergedRetriever(retrievers, 9, embed_model).retrieve("bills")
+        assert {r.node.node_id.split("-")[0] for r in results} == {"sb2654", "sb2655"}
+        assert len(results) == 6
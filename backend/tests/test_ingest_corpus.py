@@ -0,0 +1,80 @@
+from fake_astra import FakeAstraDB, FakeCollection
+from lexical import LexicalIndex
+from llama_index.core.embeddings import MockEmbedding
+from types import SimpleNamespace
+import argparse
+import asyncio
+import ingest_corpus
+import llama_index.vector_stores.astra.base as astra_base
+import pytest
+
+
+@pytest.fixture
+def astra(monkeypatch):
+    from astra_vector_store import AstraVectorStore
+    collection = FakeCollection()
+    monkeypatch.setattr(astra_base, "AstraDB", FakeAstraDB(collection))
+    store = AstraVectorStore(
+        token="token", api_endpoint="https://db.example", collection_name="general",
+        embedding_dimension=8)
+    return store, collection
+
+
+def make_ingester(tmp_path, vector_store):
+    rag = SimpleNamespace(
+        vector_store=vector_store,
+        embed_model=MockEmbedding(embed_dim=8),
+        lexical_index=LexicalIndex(),
+        lexical_index_path=str(tmp_path / "lexical.jsonl"),
+    )
+    rag.add_to_lexical_index = lambda nodes, persist=True: rag.lexical_index.add_nodes(nodes)
+    args = argparse.Namespace(
+        manifest=str(tmp_path / "manifest.json"),
+        timeline_db=str(tmp_path / "timelines.sqlite3"),
+        node_parser="sentence",
+        parse_workers=1,
+        embed_workers=1,
+        embed_batch_size=16,
+        writers=2,
+        write_batch_size=8,
+    )
+    return ingest_corpus.CorpusIngester(rag, args)
+
+
+def test_reingesting_a_file_replaces_its_rows(tmp_path, monkeypatch, astra):
+    store, collection = astra
+    pages = [f"Page {i}. " + "The Senate approved Senate Bill No. 2654 on second reading. " * 40
+             for i in range(30)]
+
+    async def parse_pdf(path):
+        return pages
+
+    monkeypatch.setattr(ingest_corpus, "parse_pdf", parse_pdf)
+
+    async def scenario():
+        ingester = make_ingester(tmp_path, store)
+        count = await ingester.ingest_file("a.pdf", "session/a.pdf", "sha-1")
+        assert count > 20  # More rows than one deleteMany call removes
+        await ingester.ingest_file("b.pdf", "session/b.pdf", "sha-1")
+        assert len(collection.rows) == 2 * count
+
+        # A changed file, then a rerun after an interrupted ingest that never
+        # reached the manifest
+        await ingester.ingest_file("a.pdf", "session/a.pdf", "sha-2")
+        ingester.manifest["files"].pop("session/a.pdf")
+        await ingester.ingest_file("a.pdf", "session/a.pdf", "sha-2")
+        assert len(collection.rows) == 2 * count
+        assert len(ingester.rag.lexical_index) == 2 * count
+
+    asyncio.run(scenario())
+
+def test_delete_by_document_matches_ref_doc_id(astra):
+    from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+    store, collection = astra
+    store.add([
+        TextNode(text=f"chunk {i}", embedding=[1.0] * 8, relationships={
+            NodeRelationship.SOURCE: RelatedNodeInfo(node_id=f"doc{i % 2}")})
+        for i in range(50)
+    ])
+    store.delete("doc0")
+    assert len(collection.rows) == 25
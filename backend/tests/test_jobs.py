@@ -0,0 +1,61 @@
+from jobs import CANCELLED, SUCCEEDED, JobManager
+import asyncio
+import threading
+
+
+def test_job_state_is_written_off_the_loop_and_coalesced(tmp_path):
+    manager = JobManager(str(tmp_path / "jobs.sqlite3"), concurrency=1, flush_interval=0.05)
+    writes = []
+    manager._conn.set_trace_callback(
+        lambda statement: statement.startswith("INSERT") and writes.append(
+            threading.current_thread().name))
+
+    async def runner(ctx):
+        for stage in range(200):
+            ctx.start_stage(f"stage{stage}", 1)
+            ctx.finish_stage(f"stage{stage}")
+            await asyncio.sleep(0)
+        return {"stages": 200}
+
+    async def scenario():
+        manager.register("work", runner)
+        await manager.start()
+        job = manager.submit("work", {})
+        while manager.get(job.id)["status"] != SUCCEEDED:
+            await asyncio.sleep(0.01)
+        await manager.stop()
+        return job.id
+
+    job_id = asyncio.run(scenario())
+    loop_thread = threading.main_thread().name
+    assert writes and loop_thread not in writes
+    # 400 stage updates plus the status changes, in far fewer writes
+    assert len(writes) < 100
+    restarted = JobManager(str(tmp_path / "jobs.sqlite3"))
+    assert restarted.get(job_id)["result"] == {"stages": 200}
+
+
+def test_finished_jobs_leave_memory_but_stay_readable(tmp_path):
+    manager = JobManager(
+        str(tmp_path / "jobs.sqlite3"), concurrency=2, flush_interval=0.01, max_finished_jobs=2)
+
+    async def runner(ctx):
+        return {"params": ctx.job.params}
+
+    async def scenario():
+        manager.register("work", runner)
+        manager.register("blocked", runner, concurrency=0)
+        await manager.start()
+        queued = manager.submit("blocked", {})
+        assert manager.cancel(queued.id)
+        jobs = [manager.submit("work", {"n": n}) for n in range(5)]
+        while any(manager.get(job.id)["status"] != SUCCEEDED for job in jobs):
+            await asyncio.sleep(0.01)
+        await manager.stop()
+        return queued, jobs
+
+    queued, jobs = asyncio.run(scenario())
+    assert len(manager._jobs) == 2
+    assert manager.get(queued.id)["status"] == CANCELLED
+    assert [manager.get(job.id)["result"] for job in jobs] == [
+        {"params": {"n": n}} for n in range(5)]
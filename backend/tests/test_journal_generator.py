@@ -0,0 +1,52 @@
+from journal_generator import REDUCE_PROMPT, JournalGenerator
+from llama_index.core.base.llms.types import ChatMessage, ChatResponse, MessageRole
+from llama_index.core.node_parser import SentenceSplitter
+from types import SimpleNamespace
+import asyncio
+
+REDUCE_MARKER = REDUCE_PROMPT.strip().split("\n")[0]
+
+
+class ScriptedLLM:
+    # Notes are "[n]" tags; a merge that covers more than max_parts of them
+    # is cut off, as a model hitting its max_tokens would be. Anything else
+    # is echoed back.
+
+    system_prompt = None
+
+    def __init__(self, max_parts: int = 100):
+        self.max_parts = max_parts
+        self.prompts = []
+
+    async def achat(self, messages, **kwargs) -> ChatResponse:
+        prompt = messages[-1].content
+        self.prompts.append(prompt)
+        if REDUCE_MARKER in prompt:
+            parts = [line.strip() for line in prompt.split("\n") if line.strip().startswith("[")]
+            cut_off = len(parts) > self.max_parts
+            text = "\n".join(parts[:self.max_parts])
+        else:
+            cut_off = False
+            text = "[" + prompt.split("part ")[1].split(" of")[0] + "]" if "Transcript:" in prompt else prompt
+        return ChatResponse(
+            message=ChatMessage(role=MessageRole.ASSISTANT, content=text),
+            raw=SimpleNamespace(choices=[SimpleNamespace(finish_reason="length" if cut_off else "stop")]),
+        )
+
+
+def test_a_cut_off_merge_is_split_instead_of_dropping_notes():
+    splitter = SentenceSplitter(chunk_size=64, chunk_overlap=0)
+    map_llm = ScriptedLLM()
+    reduce_llm = ScriptedLLM(max_parts=3)
+    generator = JournalGenerator(
+        llm=map_llm, reduce_llm=reduce_llm, final_llm=ScriptedLLM(),
+        text_splitter=splitter, chunks_per_segment=1, reduce_fanout=8)
+    pages = [f"Senator {i} moved to adopt resolution {i}. " * 6 for i in range(8)]
+
+    segments = generator.segments(pages)
+    journal = asyncio.run(generator.agenerate(pages))
+
+    assert not any(REDUCE_MARKER in prompt for prompt in map_llm.prompts)
+    assert reduce_llm.prompts
+    for part in range(1, len(segments) + 1):
+        assert f"[{part}]" in journal
@@ -0,0 +1,73 @@
+from context_assembler import ContextAssembler
+from document_metadata import hidden_keys
+from lexical import HybridRetriever, LexicalIndex
+from llama_index.core import Document
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import MetadataMode
+
+
+class EmptyRetriever(BaseRetriever):
+    def _retrieve(self, query_bundle):
+        return []
+
+
+def ingested_nodes():
+    metadata = {
+        "document_title": "Journal No. 12",
+        "file_name": "19th/journal-12.pdf",
+        "bills": "sb2654",
+        "bill_sb2654": True,
+        "date": "2024-05-06",
+        "year": 2024,
+    }
+    text = " ".join(
+        f"Sentence {i} on Senate Bill No. 2654 and its amendments." for i in range(120))
+    document = Document(
+        id_="19th/journal-12.pdf",
+        text=text,
+        metadata=metadata,
+        excluded_embed_metadata_keys=hidden_keys(metadata, embed=True),
+        excluded_llm_metadata_keys=hidden_keys(metadata),
+    )
+    return SentenceSplitter(chunk_size=128, chunk_overlap=20).get_nodes_from_documents([document])
+
+
+def test_lexical_hits_keep_exclusions_and_spans(tmp_path):
+    nodes = ingested_nodes()
+    index = LexicalIndex()
+    index.add_nodes(nodes)
+    index.save(str(tmp_path / "lexical.jsonl"))
+    loaded = LexicalIndex.load(str(tmp_path / "lexical.jsonl"))
+
+    for doc, original in enumerate(nodes):
+        node = loaded.node(doc)
+        assert node.ref_doc_id == "19th/journal-12.pdf"
+        assert (node.start_char_idx, node.end_char_idx) == (
+            original.start_char_idx, original.end_char_idx)
+        assert node.get_content(metadata_mode=MetadataMode.LLM) == original.get_content(
+            metadata_mode=MetadataMode.LLM)
+        assert "bill_sb2654" not in node.get_content(metadata_mode=MetadataMode.LLM)
+
+
+def test_records_saved_without_fields_hide_ingestion_keys(tmp_path):
+    path = tmp_path / "lexical.jsonl"
+    path.write_text(
+        '{"id": "a", "text": "SB 2654", "metadata": {"file_name": "a.pdf", "bill_sb2654": true, '
+        '"date": "2024-05-06", "document_title": "Journal"}}\n')
+    content = LexicalIndex.load(str(path)).node(0).get_content(metadata_mode=MetadataMode.LLM)
+    assert "document_title: Journal" in content
+    assert "bill_sb2654" not in content and "date" not in content
+
+
+def test_decisive_lexical_hits_merge_into_spans():
+    nodes = ingested_nodes()
+    index = LexicalIndex()
+    index.add_nodes(nodes)
+    retriever = HybridRetriever(EmptyRetriever(), index, similarity_top_k=len(nodes))
+    assert retriever.decisive("SB 2654")
+
+    results = retriever.retrieve("SB 2654")
+    assembled = ContextAssembler(token_budget=None).postprocess_nodes(results)
+    # Every chunk overlaps the next, so the whole document comes back as one span
+    assert len(assembled) == 1
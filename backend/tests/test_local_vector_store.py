@@ -0,0 +1,65 @@
+from llama_index.core import StorageContext, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery
+from local_vector_store import EMBEDDINGS_FILE, NODES_FILE, TOMBSTONES_FILE, LocalVectorStore
+
+
+def test_index_over_an_empty_store_writes_to_it(tmp_path):
+    store = LocalVectorStore(str(tmp_path), 8)
+    index = VectorStoreIndex(
+        nodes=[], embed_model=MockEmbedding(embed_dim=8),
+        storage_context=StorageContext.from_defaults(vector_store=store))
+    assert index.vector_store is store
+
+    index.insert_nodes([TextNode(id_="a", text="chunk", embedding=[1.0] * 8)])
+    assert len(LocalVectorStore(str(tmp_path), 8)) == 1
+
+
+def add_chunks(store, count, file_name):
+    return store.add([
+        TextNode(id_=f"{file_name}-{i}", text=f"chunk {i}", embedding=[1.0] + [0.0] * 7,
+                 metadata={"file_name": file_name})
+        for i in range(count)
+    ])
+
+
+def query_ids(store):
+    return store.query(VectorStoreQuery(query_embedding=[1.0] + [0.0] * 7, similarity_top_k=100)).ids
+
+
+def test_deletes_are_tombstoned_until_enough_rows_are_dead(tmp_path):
+    store = LocalVectorStore(str(tmp_path), 8)
+    add_chunks(store, 10, "a.pdf")
+    add_chunks(store, 1, "b.pdf")
+    nodes_path = tmp_path / NODES_FILE
+    before = nodes_path.stat().st_mtime_ns, nodes_path.stat().st_size
+
+    store.delete_where("file_name", "b.pdf")
+    assert (nodes_path.stat().st_mtime_ns, nodes_path.stat().st_size) == before
+    assert len(store) == 10 and "b.pdf-0" not in query_ids(store)
+
+    reopened = LocalVectorStore(str(tmp_path), 8)
+    assert len(reopened) == 10 and "b.pdf-0" not in query_ids(reopened)
+    add_chunks(reopened, 1, "c.pdf")
+    assert "c.pdf-0" in query_ids(reopened)
+
+    # Past the threshold the files are compacted and the tombstones dropped
+    reopened.delete_where("file_name", "a.pdf")
+    assert len(reopened) == 1 and not (tmp_path / TOMBSTONES_FILE).exists()
+    assert query_ids(LocalVectorStore(str(tmp_path), 8)) == ["c.pdf-0"]
+
+
+def test_a_torn_last_row_is_dropped_and_cut_off(tmp_path):
+    store = LocalVectorStore(str(tmp_path), 8)
+    add_chunks(store, 2, "a.pdf")
+    # A crash after the vector was written but partway through its row
+    with open(tmp_path / EMBEDDINGS_FILE, "ab") as f:
+        f.write(b"\0" * 32)
+    with open(tmp_path / NODES_FILE, "a", encoding="utf-8") as f:
+        f.write('{"id": "torn", "metad')
+
+    reopened = LocalVectorStore(str(tmp_path), 8)
+    assert len(reopened) == 2
+    add_chunks(reopened, 1, "b.pdf")
+    assert sorted(query_ids(LocalVectorStore(str(tmp_path), 8))) == ["a.pdf-0", "a.pdf-1", "b.pdf-0"]
@@ -11,7 +11,7 @@ const ChatInterface = () => {
   const [systemType, setSystemType] = useState('general');
   const [isSidebarOpen, setIsSidebarOpen] = useState(false);
   const [attachedFile, setAttachedFile] = useState(null);
-  const [fileContent, setFileContent] = useState([]);
+  const [documentId, setDocumentId] = useState(null);
   const textAreaRef = useRef(null);
 
   useEffect(() => {
@@ -26,6 +26,48 @@ const ChatInterface = () => {
     journal: 'Transcription Assistant'
   };
 
+  // Poll the ingestion job until it finishes one way or another
+  const waitForJob = async (jobId) => {
+    while (true) {
+      const response = await fetch(`http://localhost:8000/api/jobs/${jobId}`);
+      if (!response.ok) {
+        throw new Error('Failed to fetch ingestion status');
+      }
+      const job = await response.json();
+      if (['succeeded', 'failed', 'cancelled'].includes(job.status)) {
+        return job;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+  };
+
+  const generateJournal = async (docId) => {
+    try {
+      const response = await fetch('http://localhost:8000/api/journal/generate', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ document_id: docId }),
+      });
+      if (!response.ok) {
+        throw new Error('Failed to start journal generation');
+      }
+      const { job_id: jobId } = await response.json();
+      const job = await waitForJob(jobId);
+      if (job.status !== 'succeeded') {
+        throw new Error(job.error || `Journal generation ${job.status}`);
+      }
+      setMessages(prev => [...prev, { type: 'bot', content: job.result.journal }]);
+    } catch (error) {
+      console.error('Error generating journal:', error);
+      setMessages(prev => [...prev, {
+        type: 'error',
+        content: 'Failed to generate the journal. Please try again.'
+      }]);
+    }
+  };
+
   const handleFileSelect = async (event) => {
     const file = event.target.files[0];
     if (file && file.type === 'application/pdf') {
@@ -34,7 +76,7 @@ const ChatInterface = () => {
       formData.append('file', file);
 
       try {
-        const response = await fetch('http://localhost:8000/api/upload-pdf', {
+        const response = await fetch('http://localhost:8000/api/ingest', {
           method: 'POST',
           body: formData,
         });
@@ -43,12 +85,17 @@ const ChatInterface = () => {
           throw new Error('Failed to upload PDF');
         }
 
-        const data = await response.json();
-        setFileContent(data.content);
+        const { job_id: jobId } = await response.json();
+        const job = await waitForJob(jobId);
+        if (job.status !== 'succeeded') {
+          throw new Error(job.error || `Ingestion ${job.status}`);
+        }
+        setDocumentId(job.result.document_id);
         setMessages(prev => [...prev, {
           type: 'bot',
-          content: `PDF "${file.name}" successfully processed. You can now ask questions about its content.`
+          content: `PDF "${file.name}" successfully processed. Generating the journal; you can ask questions about its content in the meantime.`
         }]);
+        generateJournal(job.result.document_id);
       } catch (error) {
         console.error('Error uploading PDF:', error);
         setMessages(prev => [...prev, {
@@ -67,7 +114,7 @@ const ChatInterface = () => {
 
   const removeAttachment = () => {
     setAttachedFile(null);
-    setFileContent([]);
+    setDocumentId(null);
   };
 
   const handleSystemChange = (newSystem) => {
@@ -76,7 +123,7 @@ const ChatInterface = () => {
     // Clear PDF content when switching away from journal system
     if (newSystem !== 'journal') {
       setAttachedFile(null);
-      setFileContent([]);
+      setDocumentId(null);
     }
   };
 
@@ -91,7 +138,7 @@ const ChatInterface = () => {
     setMessages((prev) => [...prev, { type: 'user', content: userMessage }]);
 
     try {
-      const response = await fetch('http://localhost:8000/api/chat', {
+      const response = await fetch('http://localhost:8000/api/chat/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -103,19 +150,52 @@ const ChatInterface = () => {
             content: msg.content
           })),
           system_type: systemType,
-          pdf_content: systemType === 'journal' && fileContent.length > 0 ? fileContent : undefined
+          document_id: systemType === 'journal' && documentId ? documentId : undefined
         }),
       });
 
-      const data = await response.json();
-      setMessages((prev) => [
-        ...prev,
-        {
-          type: 'bot',
-          content: data.response,
-          sources: data.relevant_sources,
-        },
-      ]);
+      if (!response.ok || !response.body) {
+        throw new Error('Failed to get a response');
+      }
+
+      // Add an empty bot message and grow it as token frames arrive
+      setMessages((prev) => [...prev, { type: 'bot', content: '', sources: [] }]);
+      const updateLastMessage = (update) => {
+        setMessages((prev) => {
+          const next = [...prev];
+          next[next.length - 1] = update(next[next.length - 1]);
+          return next;
+        });
+      };
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let receivedFirstToken = false;
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const frame = JSON.parse(line);
+          if (frame.type === 'token') {
+            if (!receivedFirstToken) {
+              receivedFirstToken = true;
+              setIsLoading(false);
+            }
+            updateLastMessage((msg) => ({ ...msg, content: msg.content + frame.content }));
+          } else if (frame.type === 'sources') {
+            updateLastMessage((msg) => ({ ...msg, sources: frame.sources }));
+          } else if (frame.type === 'error') {
+            throw new Error(frame.detail);
+          }
+        }
+      }
     } catch (error) {
       console.error('Error:', error);
       setMessages((prev) => [
@@ -207,7 +287,9 @@ const ChatInterface = () => {
                         <p className="font-semibold text-gray-700">Relevant Sources:</p>
                         <ul className="list-disc ml-4">
                           {message.sources.map((source, idx) => (
-                            <li key={idx} className="text-gray-600">{source}</li>
+                            <li key={idx} className="text-gray-600">
+                              {typeof source === 'string' ? source : source.text}
+                            </li>
                           ))}
                         </ul>
                       </div>
@@ -2,7 +2,7 @@ import { useState } from 'react';
 import { Upload, X, FileText, Loader2 } from 'lucide-react';
 
 interface FileUploadProps {
-  onUploadComplete: (content: string[]) => void;
+  onUploadComplete: (documentId: string) => void;
 }
 
 const FileUpload: React.FC<FileUploadProps> = ({ onUploadComplete }) => {
@@ -40,7 +40,7 @@ const FileUpload: React.FC<FileUploadProps> = ({ onUploadComplete }) => {
       }
 
       const data = await response.json();
-      onUploadComplete(data.content);
+      onUploadComplete(data.document_id);
       setFile(null);
     } catch (err) {
       setError('Failed to upload file. Please try again.');